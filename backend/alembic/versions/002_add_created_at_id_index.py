@@ -0,0 +1,24 @@
+"""add (created_at, id) index for keyset pagination
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_generations_created_at_id", "generations", ["created_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_generations_created_at_id", table_name="generations")
@@ -0,0 +1,29 @@
+"""add pg_trgm GIN index on generations.prompt
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_generations_prompt_trgm",
+        "generations",
+        ["prompt"],
+        postgresql_using="gin",
+        postgresql_ops={"prompt": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_generations_prompt_trgm", table_name="generations")
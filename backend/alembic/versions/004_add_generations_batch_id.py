@@ -0,0 +1,25 @@
+"""add generations.batch_id for batch generation
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("generations", sa.Column("batch_id", sa.String(36), nullable=True))
+    op.create_index("ix_generations_batch_id", "generations", ["batch_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_generations_batch_id", table_name="generations")
+    op.drop_column("generations", "batch_id")
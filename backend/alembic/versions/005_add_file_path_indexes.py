@@ -0,0 +1,26 @@
+"""index file path columns for the shared-file check on delete
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ("output_image_path", "thumbnail_path", "reference_image_path")
+
+
+def upgrade() -> None:
+    for column in COLUMNS:
+        op.create_index(f"ix_generations_{column}", "generations", [column])
+
+
+def downgrade() -> None:
+    for column in COLUMNS:
+        op.drop_index(f"ix_generations_{column}", table_name="generations")
@@ -0,0 +1,21 @@
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.services.response_cache import CachedResponse
+
+
+def cached_json(
+    request: Request, cached: CachedResponse, cache_control: str = "no-cache"
+) -> Response:
+    """Send a pre-serialized JSON body, or 304 when the client's copy matches.
+
+    With the default "no-cache" browsers keep the body but revalidate every
+    time, so a tab polling an unchanged page gets empty 304s.
+    """
+    headers = {"ETag": cached.etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if "*" in tags or cached.etag in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
@@ -1,48 +1,206 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
+from app.models.generation import Generation
+from app.config import settings
 from app.schemas.generation import (
+    BatchGenerateRequest,
+    BatchResponse,
     GenerateRequest,
     SpriteSheetRequest,
     GenerationResponse,
 )
-from app.services.generation_service import create_generation
+from app.services.generation_service import (
+    create_batch,
+    create_generation,
+    get_batch_progress,
+    get_generation,
+)
+from app.services.progress import TERMINAL_STAGES, progress_broker
+from app.services.scheduler import SchedulerBusyError
 
 router = APIRouter()
 
 
-@router.post("/generate", response_model=GenerationResponse)
-async def generate_image(req: GenerateRequest, db: AsyncSession = Depends(get_db)):
-    gen = await create_generation(
-        db=db,
-        prompt=req.prompt,
-        model=req.model,
-        provider=req.provider,
-        negative_prompt=req.negative_prompt,
-        aspect_ratio=req.aspect_ratio,
-        image_size=req.image_size,
-        transparent_bg=req.transparent_bg,
-        reference_image_b64=req.reference_image_b64,
+def _busy(e: SchedulerBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail={
+            "message": str(e),
+            "queue_position": e.queue_position,
+            "estimated_wait_seconds": e.retry_after,
+        },
+        headers={"Retry-After": str(e.retry_after)},
     )
+
+
+async def _create(
+    req: GenerateRequest, response: Response, db: AsyncSession, **extra
+) -> Generation:
+    try:
+        gen = await create_generation(
+            db=db,
+            prompt=req.prompt,
+            model=req.model,
+            provider=req.provider,
+            negative_prompt=req.negative_prompt,
+            aspect_ratio=req.aspect_ratio,
+            image_size=req.image_size,
+            transparent_bg=req.transparent_bg,
+            reference_image_b64=req.reference_image_b64,
+            reference_image_path=req.reference_image_path,
+            background=req.background,
+            bypass_cache=req.bypass_cache,
+            **extra,
+        )
+    except SchedulerBusyError as e:
+        raise _busy(e)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if req.background:
+        response.status_code = 202
     return gen
 
 
+@router.post("/generate", response_model=GenerationResponse)
+async def generate_image(
+    req: GenerateRequest, response: Response, db: AsyncSession = Depends(get_db)
+):
+    return await _create(req, response, db)
+
+
 @router.post("/generate/sprite-sheet", response_model=GenerationResponse)
 async def generate_sprite_sheet(
-    req: SpriteSheetRequest, db: AsyncSession = Depends(get_db)
+    req: SpriteSheetRequest, response: Response, db: AsyncSession = Depends(get_db)
 ):
-    gen = await create_generation(
-        db=db,
-        prompt=req.prompt,
-        model=req.model,
-        provider=req.provider,
-        negative_prompt=req.negative_prompt,
-        aspect_ratio=req.aspect_ratio,
-        image_size=req.image_size,
-        transparent_bg=req.transparent_bg,
+    return await _create(
+        req,
+        response,
+        db,
         is_sprite_sheet=True,
         sprite_config=req.sprite_config.model_dump(),
-        reference_image_b64=req.reference_image_b64,
     )
-    return gen
+
+
+@router.post("/generate/batch", response_model=BatchResponse, status_code=202)
+async def generate_batch(req: BatchGenerateRequest, db: AsyncSession = Depends(get_db)):
+    # Checked before expanding, so a huge "variations" is not materialized
+    if req.item_count() > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large (max {settings.BATCH_MAX_ITEMS} items)",
+        )
+    prompts = req.expanded_prompts()
+
+    try:
+        batch_id, generation_ids = await create_batch(
+            db=db,
+            prompts=prompts,
+            model=req.model,
+            provider=req.provider,
+            negative_prompt=req.negative_prompt,
+            aspect_ratio=req.aspect_ratio,
+            image_size=req.image_size,
+            transparent_bg=req.transparent_bg,
+            reference_image_b64=req.reference_image_b64,
+            reference_image_path=req.reference_image_path,
+            bypass_cache=req.bypass_cache,
+        )
+    except SchedulerBusyError as e:
+        raise _busy(e)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return BatchResponse(
+        batch_id=batch_id,
+        total=len(generation_ids),
+        status_counts={"pending": len(generation_ids)},
+        generation_ids=generation_ids,
+    )
+
+
+@router.get("/generate/batch/{batch_id}", response_model=BatchResponse)
+async def get_batch(batch_id: str, db: AsyncSession = Depends(get_db)):
+    counts = await get_batch_progress(db, batch_id)
+    if not counts:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return BatchResponse(batch_id=batch_id, total=sum(counts.values()), status_counts=counts)
+
+
+@router.get("/generate/{generation_id}/events")
+async def generation_events(
+    generation_id: str, request: Request, db: AsyncSession = Depends(get_db)
+):
+    """Server-Sent Events stream of a generation's progress.
+
+    Sends one event per stage (queued, started, prompt_built,
+    provider_request_sent, provider_response_received, background_removed,
+    saved, then completed or failed) with elapsed_ms and stage_ms timings,
+    and closes after the terminal event. Events come from the in-process
+    progress broker; the database is read once, at connect. A generation
+    that already finished gets a single terminal event built from its
+    record. Reconnecting clients resume after their Last-Event-ID.
+    """
+    try:
+        after = int(request.headers.get("last-event-id", 0))
+    except ValueError:
+        after = 0
+
+    # Subscribe before reading the record so no event falls in between
+    queue = progress_broker.subscribe(generation_id, after)
+    try:
+        gen = await get_generation(db, generation_id)
+        # Release the connection before the stream starts
+        await db.close()
+    except BaseException:
+        progress_broker.unsubscribe(generation_id, queue)
+        raise
+    if gen is None:
+        progress_broker.unsubscribe(generation_id, queue)
+        raise HTTPException(status_code=404, detail="Generation not found")
+
+    if gen.status in TERMINAL_STAGES and queue.empty():
+        queue.put_nowait(
+            {
+                "generation_id": gen.id,
+                "seq": after + 1,
+                "stage": gen.status,
+                "at": gen.updated_at.isoformat(),
+                "output_image_path": gen.output_image_path,
+                "thumbnail_path": gen.thumbnail_path,
+                "error": gen.error_message,
+            }
+        )
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    # Dropped by the broker; the client reconnects and resumes
+                    return
+                yield f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+                if event["stage"] in TERMINAL_STAGES:
+                    return
+        finally:
+            progress_broker.unsubscribe(generation_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
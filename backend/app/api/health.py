@@ -0,0 +1,37 @@
+import asyncio
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from app.database import ping
+
+router = APIRouter()
+
+DB_PING_TIMEOUT = 2.0
+
+
+@router.get("/health/live")
+async def liveness():
+    """The process is up and serving requests; checks no dependencies."""
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+async def readiness(request: Request):
+    """Whether this instance should receive traffic.
+
+    Not ready before startup has finished, once shutdown has begun, or while
+    the database does not answer within DB_PING_TIMEOUT seconds.
+    """
+    checks = {"startup": bool(getattr(request.app.state, "ready", False))}
+    try:
+        await asyncio.wait_for(ping(), timeout=DB_PING_TIMEOUT)
+        checks["database"] = True
+    except Exception:
+        checks["database"] = False
+
+    ready = all(checks.values())
+    return JSONResponse(
+        {"status": "ok" if ready else "unavailable", "checks": checks},
+        status_code=200 if ready else 503,
+    )
@@ -1,8 +1,10 @@
 import math
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.caching import cached_json
 from app.database import get_db
 from app.schemas.generation import GenerationResponse, GenerationListResponse
 from app.services.generation_service import (
@@ -10,29 +12,58 @@ from app.services.generation_service import (
     list_generations,
     delete_generation,
 )
+from app.services.response_cache import response_cache
 
 router = APIRouter()
 
 
 @router.get("/history", response_model=GenerationListResponse)
 async def get_history(
+    request: Request,
     page: int = 1,
     page_size: int = 20,
     provider: str | None = None,
     search: str | None = None,
+    cursor: str | None = None,
+    total_mode: Literal["exact", "estimate", "none"] = "exact",
+    sort: Literal["recent", "relevance"] = "recent",
     db: AsyncSession = Depends(get_db),
 ):
-    items, total = await list_generations(
-        db, page=page, page_size=page_size, provider=provider, search=search
-    )
-    total_pages = math.ceil(total / page_size) if total > 0 else 0
-    return GenerationListResponse(
-        items=items,
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=total_pages,
-    )
+    """List generations; pages are served from the response cache.
+
+    Any generation write in this process invalidates the cached pages, and
+    responses carry an ETag so unchanged pages revalidate with 304.
+    """
+
+    async def build() -> bytes:
+        items, total, next_cursor = await list_generations(
+            db,
+            page=page,
+            page_size=page_size,
+            provider=provider,
+            search=search,
+            cursor=cursor,
+            total_mode=total_mode,
+            sort=sort,
+        )
+        total_pages = None
+        if total is not None:
+            total_pages = math.ceil(total / page_size) if total > 0 else 0
+        return GenerationListResponse(
+            items=items,
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+        ).model_dump_json().encode()
+
+    key = (page, page_size, provider, search, cursor, total_mode, sort)
+    try:
+        cached = await response_cache.get_or_build("history", key, build)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return cached_json(request, cached)
 
 
 @router.get("/history/{generation_id}", response_model=GenerationResponse)
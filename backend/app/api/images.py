@@ -1,21 +1,94 @@
+import os
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+import aiofiles.os
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.responses import FileResponse, RedirectResponse, Response
 
+from app.config import settings
 from app.services import file_service
+from app.services.derivative_service import derivative_service
+from app.services.storage import storage
 
 router = APIRouter()
 
 
+def _etag(st: os.stat_result) -> str:
+    """Strong validator from file identity; stored files never change in place."""
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _not_modified(request: Request, etag: str, st: os.stat_result) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(st.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
 @router.get("/images/{folder}/{filename}")
-async def serve_image(folder: str, filename: str):
-    if folder not in ("outputs", "uploads"):
+async def serve_image(
+    request: Request,
+    folder: str,
+    filename: str,
+    w: int | None = None,
+    format: str | None = None,
+):
+    """Serve a stored image, or a resized/re-encoded variant when *w* or
+    *format* is given (rendered on first request and cached on disk).
+
+    Files are immutable once written, so responses carry a strong ETag and a
+    long-lived immutable Cache-Control, answer conditional requests with 304
+    and support Range requests. When the storage backend can hand out URLs
+    (object storage), originals are answered with a redirect instead, so the
+    bytes never pass through the API process.
+    """
+    folder_dirs = {"outputs": settings.OUTPUT_DIR, "uploads": settings.UPLOAD_DIR}
+    if folder not in folder_dirs:
         raise HTTPException(status_code=400, detail="Invalid folder")
+    if filename.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    key = str(Path(folder_dirs[folder]) / filename)
+
+    if w is not None or format is not None:
+        try:
+            width, fmt = derivative_service.validate(w, format)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            file_path = await derivative_service.get(key, folder, width, fmt)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Image not found")
+        st = await aiofiles.os.stat(file_path)
+    else:
+        url = await storage.url(key)
+        if url is not None:
+            return RedirectResponse(
+                url,
+                status_code=307,
+                headers={"Cache-Control": f"public, max-age={storage.url_max_age}"},
+            )
+        found = await file_service.file_stats.lookup(key)
+        if found is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        file_path, st = found
 
-    file_path = file_service.get_file_path(f"public/{folder}/{filename}")
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Image not found")
+    etag = _etag(st)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.IMAGE_CACHE_MAX_AGE}, immutable",
+    }
+    if _not_modified(request, etag, st):
+        headers["Last-Modified"] = formatdate(st.st_mtime, usegmt=True)
+        return Response(status_code=304, headers=headers)
 
     suffix = file_path.suffix.lower()
     media_types = {
@@ -26,7 +99,7 @@ async def serve_image(folder: str, filename: str):
         ".webp": "image/webp",
     }
     media_type = media_types.get(suffix, "application/octet-stream")
-    return FileResponse(file_path, media_type=media_type)
+    return FileResponse(file_path, media_type=media_type, headers=headers, stat_result=st)
 
 
 @router.post("/upload-reference")
@@ -34,9 +107,11 @@ async def upload_reference(file: UploadFile = File(...)):
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
-    contents = await file.read()
-    if len(contents) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File too large (max 10MB)")
-
-    path = file_service.save_upload(contents, file.filename or "upload.png")
+    max_mb = settings.MAX_UPLOAD_BYTES // (1024 * 1024)
+    try:
+        path = await file_service.save_upload_stream(
+            file, file.filename or "upload.png", settings.MAX_UPLOAD_BYTES
+        )
+    except file_service.UploadTooLargeError:
+        raise HTTPException(status_code=400, detail=f"File too large (max {max_mb}MB)")
     return {"path": path, "filename": Path(path).name}
@@ -0,0 +1,50 @@
+import time
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.metrics import http_request_seconds
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+class RequestMetricsMiddleware:
+    """Records request latency per route template (e.g. /images/{folder}/{filename}).
+
+    Plain ASGI rather than BaseHTTPMiddleware, so responses are not buffered
+    and the per-request overhead is a timer and one histogram observation.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths
+            # share one label to keep cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_seconds.labels(scope["method"], route, str(status)).observe(
+                time.perf_counter() - start
+            )
@@ -1,13 +1,23 @@
-from fastapi import APIRouter
+import math
 
+from fastapi import APIRouter, Request
+
+from app.api.caching import cached_json
 from app.schemas.generation import ModelsResponse
 from app.services.gemini_provider import gemini_provider
 from app.services.openrouter_provider import openrouter_provider
+from app.services.response_cache import response_cache
 
 router = APIRouter()
 
 
 @router.get("/models", response_model=ModelsResponse)
-async def list_models():
-    models = gemini_provider.list_models() + openrouter_provider.list_models()
-    return ModelsResponse(models=models)
+async def list_models(request: Request):
+    """The model catalogue is static, so it is serialized once per process."""
+
+    async def build() -> bytes:
+        models = gemini_provider.list_models() + openrouter_provider.list_models()
+        return ModelsResponse(models=models).model_dump_json().encode()
+
+    cached = await response_cache.get_or_build("models", (), build, ttl=math.inf)
+    return cached_json(request, cached, cache_control="public, max-age=300")
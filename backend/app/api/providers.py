@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+
+from app.services.resilience import provider_caller
+from app.services.scheduler import provider_scheduler
+
+router = APIRouter()
+
+
+@router.get("/providers/status")
+async def provider_status():
+    """Circuit state, call counters and scheduler queues per provider model."""
+    return {
+        "providers": provider_caller.stats(),
+        "scheduler": provider_scheduler.stats(),
+    }
@@ -1,32 +1,74 @@
 import ssl
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import settings
 
-# Build connect_args for cloud PostgreSQL (SSL required by most providers)
-connect_args: dict = {}
-db_url = settings.async_database_url
-
-# Auto-enable SSL for non-localhost, non-internal connections
-no_ssl_hosts = ["localhost", "127.0.0.1", ".zeabur.internal"]
-if not any(h in db_url for h in no_ssl_hosts):
-    ssl_ctx = ssl.create_default_context()
-    ssl_ctx.check_hostname = False
-    ssl_ctx.verify_mode = ssl.CERT_NONE
-    connect_args["ssl"] = ssl_ctx
-
-engine = create_async_engine(
-    db_url,
-    echo=settings.DEBUG,
-    connect_args=connect_args,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    pool_recycle=300,
-)
-async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# Created on first use, so importing the app does not build the engine or an
+# SSL context
+_engine: AsyncEngine | None = None
+_session_factory: async_sessionmaker[AsyncSession] | None = None
+
+
+def get_engine() -> AsyncEngine:
+    global _engine
+    if _engine is None:
+        # Build connect_args for cloud PostgreSQL (SSL required by most providers)
+        connect_args: dict = {}
+        db_url = settings.async_database_url
+
+        # Auto-enable SSL for non-localhost, non-internal PostgreSQL connections
+        no_ssl_hosts = ["localhost", "127.0.0.1", ".zeabur.internal"]
+        if db_url.startswith("postgresql") and not any(h in db_url for h in no_ssl_hosts):
+            # Certificates are not verified, so skip loading the system CA store
+            ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            ssl_ctx.check_hostname = False
+            ssl_ctx.verify_mode = ssl.CERT_NONE
+            connect_args["ssl"] = ssl_ctx
+
+        _engine = create_async_engine(
+            db_url,
+            echo=settings.DEBUG,
+            connect_args=connect_args,
+            pool_pre_ping=True,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return _engine
+
+
+def async_session() -> AsyncSession:
+    """Open a new session (use as ``async with async_session() as db``)."""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = async_sessionmaker(
+            get_engine(), class_=AsyncSession, expire_on_commit=False
+        )
+    return _session_factory()
+
+
+def pool_checked_out() -> int:
+    """Connections currently checked out of the pool (0 before first use)."""
+    if _engine is None:
+        return 0
+    return getattr(_engine.sync_engine.pool, "checkedout", lambda: 0)()
+
+
+async def ping() -> None:
+    """Run a trivial query; raises if the database is unreachable."""
+    async with get_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def dispose_engine() -> None:
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = _session_factory = None
 
 
 class Base(DeclarativeBase):
@@ -5,8 +5,17 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.metrics import RequestMetricsMiddleware
+from app.api.metrics import router as metrics_router
 from app.config import settings
-from app.database import engine, Base
+from app.database import Base, dispose_engine, get_engine
+from app.services.cpu_pool import cpu_pool
+from app.services.file_reaper import file_reaper
+from app.services.gemini_provider import gemini_provider
+from app.services.generation_service import fail_stale_generations
+from app.services.job_queue import generation_queue
+from app.services.openrouter_provider import openrouter_provider
+from app.services.storage import storage
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 logger = logging.getLogger(__name__)
@@ -14,6 +23,51 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    app.state.ready = False
+    if settings.FAST_STARTUP:
+        # Schema comes from migrations; the engine and provider clients are
+        # created on first use and readiness reports database reachability
+        logger.info("Fast startup: skipping create_all and provider pre-connect.")
+    else:
+        await _prepare_database()
+        await openrouter_provider.startup(preconnect=settings.OPENROUTER_PRECONNECT)
+
+    cpu_pool.start()
+    await storage.start()
+    file_reaper.start()
+    generation_queue.start()
+    recovery = asyncio.create_task(_fail_stale_generations())
+    app.state.ready = True
+
+    yield
+    app.state.ready = False
+    await asyncio.gather(recovery, return_exceptions=True)
+    await generation_queue.stop()
+    await file_reaper.stop()
+    await storage.stop()
+    cpu_pool.shutdown()
+    await openrouter_provider.aclose()
+    await gemini_provider.aclose()
+    await dispose_engine()
+
+
+async def _fail_stale_generations() -> None:
+    """Give a final state to generations a crashed process left unfinished.
+
+    Runs in the background so a slow or unreachable database does not hold
+    up startup; readiness reports the database separately.
+    """
+    try:
+        count = await fail_stale_generations(settings.GENERATION_STALE_AFTER)
+    except Exception as e:
+        logger.warning(f"Could not fail stale generations: {e}")
+        return
+    if count:
+        logger.warning(f"Marked {count} stale generations as failed.")
+
+
+async def _prepare_database() -> None:
+    """Create missing tables, retrying while the database warms up."""
     # Log masked DATABASE_URL for debugging
     db_url = settings.async_database_url
     if "@" in db_url:
@@ -26,7 +80,7 @@ async def lifespan(app: FastAPI):
     max_retries = 10
     for attempt in range(1, max_retries + 1):
         try:
-            async with engine.begin() as conn:
+            async with get_engine().begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
             logger.info("Database connected and tables created.")
             break
@@ -38,9 +92,6 @@ async def lifespan(app: FastAPI):
             logger.warning(f"DB connection attempt {attempt}/{max_retries} failed: {e}. Retrying in {wait}s...")
             await asyncio.sleep(wait)
 
-    yield
-    await engine.dispose()
-
 
 app = FastAPI(
     title="Game Asset Generator",
@@ -48,6 +99,7 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+app.add_middleware(RequestMetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[o.strip() for o in settings.ALLOWED_ORIGINS.split(",")],
@@ -60,3 +112,4 @@ from app.api.router import api_router  # noqa: E402
 from app.models.generation import Generation  # noqa: E402, F401
 
 app.include_router(api_router, prefix="/api")
+app.include_router(metrics_router, tags=["metrics"])
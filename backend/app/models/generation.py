@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, DateTime, Integer, JSON, String, Text
+from sqlalchemy import Boolean, DateTime, Index, Integer, JSON, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -9,6 +9,12 @@ from app.database import Base
 
 class Generation(Base):
     __tablename__ = "generations"
+    __table_args__ = (
+        # Serves newest-first listing and keyset pagination on (created_at, id)
+        Index("ix_generations_created_at_id", "created_at", "id"),
+        # The pg_trgm GIN index on prompt lives in migration 003 only, since
+        # create_all cannot assume the extension is installed.
+    )
 
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=lambda: str(uuid.uuid4())
@@ -24,12 +30,18 @@ class Generation(Base):
     transparent_bg: Mapped[bool] = mapped_column(Boolean, default=False)
     is_sprite_sheet: Mapped[bool] = mapped_column(Boolean, default=False)
     sprite_config: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # File paths are indexed for the shared-file check when deleting
     reference_image_path: Mapped[str | None] = mapped_column(
-        String(500), nullable=True
+        String(500), nullable=True, index=True
+    )
+    output_image_path: Mapped[str | None] = mapped_column(
+        String(500), nullable=True, index=True
+    )
+    thumbnail_path: Mapped[str | None] = mapped_column(
+        String(500), nullable=True, index=True
     )
-    output_image_path: Mapped[str | None] = mapped_column(String(500), nullable=True)
-    thumbnail_path: Mapped[str | None] = mapped_column(String(500), nullable=True)
     status: Mapped[str] = mapped_column(String(20), default="pending")
+    batch_id: Mapped[str | None] = mapped_column(String(36), nullable=True, index=True)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
     metadata_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
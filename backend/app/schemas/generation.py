@@ -1,13 +1,30 @@
 from datetime import datetime
 from typing import Literal
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+# Bounds on sprite sheets; in per_frame mode every frame is a paid provider call
+SPRITE_MAX_GRID = 16
+SPRITE_MAX_FRAMES = 64
 
 
 class SpriteConfig(BaseModel):
-    rows: int = 4
-    cols: int = 4
-    frame_count: int = 16
+    rows: int = Field(default=4, ge=1, le=SPRITE_MAX_GRID)
+    cols: int = Field(default=4, ge=1, le=SPRITE_MAX_GRID)
+    frame_count: int = Field(default=16, ge=1, le=SPRITE_MAX_FRAMES)
+    # "grid": one provider call draws the whole sheet.
+    # "per_frame": one call per frame, stitched together server-side.
+    mode: Literal["grid", "per_frame"] = "grid"
+    # Slice, trim and bin-pack the frames into an atlas; the frame map is
+    # stored in metadata_json["atlas"]
+    export_atlas: bool = False
+
+    @model_validator(mode="after")
+    def check_frame_count(self) -> "SpriteConfig":
+        if self.frame_count > self.rows * self.cols:
+            raise ValueError("frame_count cannot exceed rows * cols")
+        return self
 
 
 class GenerateRequest(BaseModel):
@@ -19,6 +36,12 @@ class GenerateRequest(BaseModel):
     image_size: str = "1024x1024"
     transparent_bg: bool = False
     reference_image_b64: str | None = None
+    # Path returned by /api/upload-reference; preferred over reference_image_b64
+    reference_image_path: str | None = None
+    # Return 202 with a pending record and run the generation on the worker pool
+    background: bool = False
+    # Skip the result cache and always ask the provider for a new variation
+    bypass_cache: bool = False
 
 
 class SpriteSheetRequest(GenerateRequest):
@@ -26,6 +49,45 @@ class SpriteSheetRequest(GenerateRequest):
     sprite_config: SpriteConfig = SpriteConfig()
 
 
+class BatchGenerateRequest(BaseModel):
+    """Either a list of *prompts*, or one *prompt* run *variations* times."""
+
+    prompts: list[str] | None = None
+    prompt: str | None = None
+    variations: int = Field(default=1, ge=1)
+    negative_prompt: str | None = None
+    model: str
+    provider: Literal["gemini", "openrouter"]
+    aspect_ratio: str = "1:1"
+    image_size: str = "1024x1024"
+    transparent_bg: bool = False
+    reference_image_b64: str | None = None
+    reference_image_path: str | None = None
+    bypass_cache: bool = False
+
+    @model_validator(mode="after")
+    def check_prompts(self) -> "BatchGenerateRequest":
+        if not self.prompts and not self.prompt:
+            raise ValueError("Either prompts or prompt is required")
+        return self
+
+    def item_count(self) -> int:
+        """Number of generations the batch expands to, without expanding it."""
+        return len(self.prompts) if self.prompts else self.variations
+
+    def expanded_prompts(self) -> list[str]:
+        if self.prompts:
+            return list(self.prompts)
+        return [self.prompt] * self.variations
+
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    total: int
+    status_counts: dict[str, int]
+    generation_ids: list[str] | None = None
+
+
 class GenerationResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -45,6 +107,7 @@ class GenerationResponse(BaseModel):
     output_image_path: str | None = None
     thumbnail_path: str | None = None
     status: str = "pending"
+    batch_id: str | None = None
     error_message: str | None = None
     metadata_json: dict | None = None
     created_at: datetime
@@ -53,10 +116,13 @@ class GenerationResponse(BaseModel):
 
 class GenerationListResponse(BaseModel):
     items: list[GenerationResponse]
-    total: int
+    # None when the request asked for total_mode="none"
+    total: int | None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: int | None
+    # Pass as ?cursor= to fetch the next page by keyset instead of OFFSET
+    next_cursor: str | None = None
 
 
 class ModelInfo(BaseModel):
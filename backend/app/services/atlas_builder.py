@@ -0,0 +1,183 @@
+import io
+import math
+from dataclasses import dataclass
+
+
+@dataclass
+class Rect:
+    x: int
+    y: int
+    w: int
+    h: int
+
+
+class MaxRectsPacker:
+    """MaxRects bin packer using the best-short-side-fit heuristic."""
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.free: list[Rect] = [Rect(0, 0, width, height)]
+
+    def insert(self, w: int, h: int) -> Rect | None:
+        best: Rect | None = None
+        best_short = best_long = math.inf
+        for free in self.free:
+            if w <= free.w and h <= free.h:
+                short = min(free.w - w, free.h - h)
+                long = max(free.w - w, free.h - h)
+                if (short, long) < (best_short, best_long):
+                    best, best_short, best_long = Rect(free.x, free.y, w, h), short, long
+        if best is None:
+            return None
+
+        next_free: list[Rect] = []
+        for free in self.free:
+            next_free.extend(self._split(free, best))
+        self.free = self._prune(next_free)
+        return best
+
+    @staticmethod
+    def _split(free: Rect, used: Rect) -> list[Rect]:
+        if (
+            used.x >= free.x + free.w
+            or used.x + used.w <= free.x
+            or used.y >= free.y + free.h
+            or used.y + used.h <= free.y
+        ):
+            return [free]
+
+        parts = []
+        if used.x > free.x:
+            parts.append(Rect(free.x, free.y, used.x - free.x, free.h))
+        if used.x + used.w < free.x + free.w:
+            right = used.x + used.w
+            parts.append(Rect(right, free.y, free.x + free.w - right, free.h))
+        if used.y > free.y:
+            parts.append(Rect(free.x, free.y, free.w, used.y - free.y))
+        if used.y + used.h < free.y + free.h:
+            bottom = used.y + used.h
+            parts.append(Rect(free.x, bottom, free.w, free.y + free.h - bottom))
+        return parts
+
+    @staticmethod
+    def _prune(rects: list[Rect]) -> list[Rect]:
+        """Drop free rectangles fully contained in another one."""
+        kept = []
+        for i, a in enumerate(rects):
+            contained = any(
+                i != j
+                and a.x >= b.x
+                and a.y >= b.y
+                and a.x + a.w <= b.x + b.w
+                and a.y + a.h <= b.y + b.h
+                and (a != b or i > j)
+                for j, b in enumerate(rects)
+            )
+            if not contained:
+                kept.append(a)
+        return kept
+
+
+def _pack(sizes: list[tuple[int, int]], max_size: int) -> tuple[int, int, list[Rect]]:
+    """Pack (w, h) sizes into the smallest power-of-two atlas that fits.
+
+    Raises:
+        ValueError: If the frames do not fit within *max_size* x *max_size*.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: max(sizes[i]), reverse=True)
+    area = sum(w * h for w, h in sizes)
+    widest = max(w for w, _ in sizes)
+    tallest = max(h for _, h in sizes)
+
+    width = 1 << max(math.ceil(math.log2(max(widest, math.isqrt(area) or 1))), 0)
+    height = 1 << max(math.ceil(math.log2(tallest)), 0)
+    while width <= max_size and height <= max_size:
+        packer = MaxRectsPacker(width, height)
+        placed: list[Rect | None] = [None] * len(sizes)
+        for i in order:
+            rect = packer.insert(*sizes[i])
+            if rect is None:
+                break
+            placed[i] = rect
+        else:
+            return width, height, placed  # type: ignore[return-value]
+        # Grow the shorter side first to keep the atlas roughly square
+        if height < width:
+            height *= 2
+        else:
+            width *= 2
+    raise ValueError(f"Frames do not fit in a {max_size}x{max_size} atlas")
+
+
+def build_atlas(
+    sheet_bytes: bytes,
+    cols: int,
+    rows: int,
+    frame_count: int,
+    padding: int = 2,
+    max_size: int = 8192,
+) -> tuple[bytes, dict]:
+    """Slice a sprite sheet by its grid, trim transparent borders and pack an atlas.
+
+    Trimming uses the alpha band's bounding box per frame, computed inside
+    Pillow. Only the sheet, its alpha band and the atlas are held in memory;
+    frames are cropped straight from the sheet into the atlas.
+
+    Returns (atlas PNG bytes, frame map). The frame map lists, per frame index,
+    its rectangle in the atlas and its offset within the original cell.
+    """
+    from PIL import Image
+
+    sheet = Image.open(io.BytesIO(sheet_bytes)).convert("RGBA")
+    frame_w, frame_h = sheet.width // cols, sheet.height // rows
+    frame_count = min(frame_count, cols * rows)
+    alpha = sheet.getchannel("A")
+
+    boxes: list[tuple[int, int, int, int] | None] = []
+    for index in range(frame_count):
+        left, top = (index % cols) * frame_w, (index // cols) * frame_h
+        bbox = alpha.crop((left, top, left + frame_w, top + frame_h)).getbbox()
+        boxes.append(
+            None
+            if bbox is None
+            else (left + bbox[0], top + bbox[1], left + bbox[2], top + bbox[3])
+        )
+    del alpha
+
+    packed = [i for i, box in enumerate(boxes) if box is not None]
+    if not packed:
+        raise ValueError("Sprite sheet has no visible frames")
+    sizes = [
+        (boxes[i][2] - boxes[i][0] + padding, boxes[i][3] - boxes[i][1] + padding)
+        for i in packed
+    ]
+    atlas_w, atlas_h, rects = _pack(sizes, max_size)
+
+    atlas = Image.new("RGBA", (atlas_w, atlas_h), (0, 0, 0, 0))
+    frames = []
+    placements = dict(zip(packed, rects))
+    for index, box in enumerate(boxes):
+        entry: dict = {
+            "index": index,
+            "source_size": {"w": frame_w, "h": frame_h},
+        }
+        if box is None:
+            entry.update(frame=None, trimmed=True, sprite_source_size=None)
+        else:
+            rect = placements[index]
+            w, h = box[2] - box[0], box[3] - box[1]
+            atlas.paste(sheet.crop(box), (rect.x, rect.y))
+            cell_x, cell_y = (index % cols) * frame_w, (index // cols) * frame_h
+            entry.update(
+                frame={"x": rect.x, "y": rect.y, "w": w, "h": h},
+                trimmed=(w, h) != (frame_w, frame_h),
+                sprite_source_size={"x": box[0] - cell_x, "y": box[1] - cell_y, "w": w, "h": h},
+            )
+        frames.append(entry)
+    del sheet
+
+    buf = io.BytesIO()
+    atlas.save(buf, format="PNG", optimize=True)
+    frame_map = {"size": {"w": atlas_w, "h": atlas_h}, "frames": frames}
+    return buf.getvalue(), frame_map
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TypeVar
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CPUPool:
+    """Process pool for CPU-bound Pillow work, keeping it off the event loop.
+
+    Functions and arguments must be picklable (top-level functions taking and
+    returning bytes). With ``workers=0`` or before ``start`` jobs run inline,
+    which keeps tests and scripts simple.
+
+    A worker dying (e.g. killed for memory) breaks the whole executor; it is
+    then replaced and the jobs it failed are retried once, so a job that
+    keeps killing its worker fails on its own.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._queued = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs submitted to the pool that have not finished yet."""
+        return self._queued
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._executor is not None:
+            return
+        self._executor = self._create_executor()
+        logger.info(f"CPU pool started with {self.workers} processes.")
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def _replace_broken(self, broken: ProcessPoolExecutor) -> None:
+        # Every job in flight on *broken* fails; only the first replaces it
+        if self._executor is broken:
+            logger.warning("CPU pool worker died; starting a new pool.")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create_executor()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        if self._executor is None:
+            return fn(*args)
+
+        self._queued += 1
+        try:
+            loop = asyncio.get_running_loop()
+            for attempt in range(2):
+                executor = self._executor
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    if self._executor is None:
+                        raise
+                    self._replace_broken(executor)
+                    if attempt:
+                        raise
+        finally:
+            self._queued -= 1
+
+
+cpu_pool = CPUPool(workers=settings.IMAGE_PROCESS_WORKERS)
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import aiofiles
+import aiofiles.os
+
+from app.config import settings
+from app.services.cpu_pool import cpu_pool
+from app.services.image_processor import render_variant
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_FORMATS = ("webp", "png")
+
+
+class DerivativeService:
+    """Lazily rendered, disk-cached image variants (width x format).
+
+    Source files are UUID- or hash-named and never change, so a variant's name
+    is derived from the source name alone. The cache directory is bounded by
+    *max_bytes* with least-recently-served eviction, and concurrent requests
+    for the same variant share a single render.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, widths: list[int]) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.widths = widths
+        self._index: OrderedDict[str, int] | None = None
+        self._total_bytes = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def validate(self, width: int | None, fmt: str | None) -> tuple[int, str]:
+        """Normalise requested variant parameters.
+
+        Raises:
+            ValueError: If the width or format is not allowed.
+        """
+        fmt = (fmt or "webp").lower()
+        if fmt not in DERIVATIVE_FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        width = width or max(self.widths)
+        if width not in self.widths:
+            allowed = ", ".join(str(w) for w in self.widths)
+            raise ValueError(f"Unsupported width {width}; allowed: {allowed}")
+        return width, fmt
+
+    async def get(self, source: str, folder: str, width: int, fmt: str) -> Path:
+        """Return the path of the variant of stored file *source*, rendering
+        it on first request.
+
+        Variants are cached on local disk whichever storage backend holds the
+        source.
+
+        Raises:
+            FileNotFoundError: If the source file does not exist.
+        """
+        name = f"{folder}_{Path(source).stem}_w{width}.{fmt}"
+        index = await self._load_index()
+        target = self.directory / name
+
+        if name in index and await aiofiles.os.path.isfile(target):
+            index.move_to_end(name)
+            return target
+
+        inflight = self._inflight.get(name)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[name] = future
+        try:
+            data = await cpu_pool.run(render_variant, await storage.read(source), width, fmt)
+            tmp = target.with_name(f".{uuid.uuid4().hex}.part")
+            async with aiofiles.open(tmp, "wb") as f:
+                await f.write(data)
+            await aiofiles.os.replace(tmp, target)
+            await self._add(name, len(data))
+            future.set_result(target)
+            return target
+        except BaseException as e:
+            future.set_exception(
+                e if isinstance(e, Exception) else RuntimeError("Render cancelled")
+            )
+            future.exception()
+            raise
+        finally:
+            del self._inflight[name]
+
+    async def discard_source(self, folder: str, source_name: str) -> None:
+        """Delete every cached variant of a source file."""
+        index = await self._load_index()
+        prefix = f"{folder}_{Path(source_name).stem}_w"
+        for name in [n for n in index if n.startswith(prefix)]:
+            self._total_bytes -= index.pop(name)
+            await self._unlink(name)
+
+    async def _load_index(self) -> OrderedDict[str, int]:
+        if self._index is None:
+            # The first call scans the cache directory, off the event loop
+            index = await asyncio.to_thread(self._scan)
+            if self._index is None:
+                self._index = index
+                self._total_bytes = sum(index.values())
+        return self._index
+
+    def _scan(self) -> OrderedDict[str, int]:
+        """Cached variants by name with their sizes, least recently written first."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stats = [
+            (p.name, p.stat())
+            for p in self.directory.iterdir()
+            if p.is_file() and not p.name.startswith(".")
+        ]
+        stats.sort(key=lambda item: item[1].st_mtime)
+        return OrderedDict((name, st.st_size) for name, st in stats)
+
+    async def _add(self, name: str, size: int) -> None:
+        index = await self._load_index()
+        if name in index:
+            self._total_bytes -= index.pop(name)
+        index[name] = size
+        self._total_bytes += size
+        while self._total_bytes > self.max_bytes and len(index) > 1:
+            evicted, evicted_size = index.popitem(last=False)
+            self._total_bytes -= evicted_size
+            await self._unlink(evicted)
+            logger.debug(f"Evicted image derivative {evicted}")
+
+    async def _unlink(self, name: str) -> None:
+        try:
+            await aiofiles.os.remove(self.directory / name)
+        except FileNotFoundError:
+            pass
+
+
+derivative_service = DerivativeService(
+    directory=settings.DERIVATIVE_DIR,
+    max_bytes=settings.DERIVATIVE_CACHE_MAX_BYTES,
+    widths=settings.derivative_widths,
+)
@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+import logging
+
+from app.config import settings
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+
+class FileReaper:
+    """Deletes stored files in the background, in batches.
+
+    ``schedule`` queues paths and returns immediately; a background task
+    deletes them every *interval* seconds, or as soon as *batch_size* are
+    queued, with one storage call per batch. ``cancel`` takes paths back out,
+    e.g. when a content-addressed upload is stored again before being reaped.
+    ``is_scheduled`` is true from ``schedule`` until the delete has finished.
+    Before ``start`` (scripts, tests) paths are deleted inline.
+    """
+
+    def __init__(self, interval: float, batch_size: int) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self._pending: dict[str, None] = {}
+        self._deleting: set[str] = set()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="file-reaper")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self._reap()
+
+    async def schedule(self, *paths: str) -> None:
+        if self._task is None:
+            await storage.delete(*paths)
+            return
+        self._pending.update(dict.fromkeys(paths))
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def is_scheduled(self, path: str) -> bool:
+        return path in self._pending or path in self._deleting
+
+    def cancel(self, *paths: str) -> None:
+        for path in paths:
+            self._pending.pop(path, None)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self._reap()
+
+    async def _reap(self) -> None:
+        while self._pending:
+            batch = list(itertools.islice(self._pending, self.batch_size))
+            for path in batch:
+                del self._pending[path]
+            self._deleting.update(batch)
+            try:
+                await storage.delete(*batch)
+            except Exception:
+                logger.exception(f"Failed to delete {len(batch)} files; will retry")
+                self._pending.update(dict.fromkeys(batch))
+                return
+            finally:
+                self._deleting.difference_update(batch)
+            logger.debug(f"Reaped {len(batch)} files")
+
+
+file_reaper = FileReaper(
+    interval=settings.FILE_REAPER_INTERVAL,
+    batch_size=settings.FILE_REAPER_BATCH_SIZE,
+)
@@ -1,60 +1,207 @@
+import contextlib
+import hashlib
+import os
+import stat
+import time
 import uuid
+from collections import OrderedDict
 from pathlib import Path
+from typing import Protocol
 
-from PIL import Image
-import io
+import aiofiles
+import aiofiles.os
 
 from app.config import settings
+from app.services.file_reaper import file_reaper
+from app.services.image_processor import make_thumbnail
+from app.services.storage import storage
 
 THUMBNAIL_SIZE = (256, 256)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 
-def save_image(image_bytes: bytes, prefix: str = "gen") -> tuple[str, str]:
-    """Save image bytes to OUTPUT_DIR and generate a 256x256 thumbnail.
+class UploadTooLargeError(ValueError):
+    """Raised when an upload stream exceeds the allowed size."""
+
+
+class AsyncReadable(Protocol):
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+async def save_image(
+    image_bytes: bytes, prefix: str = "gen", thumbnail_bytes: bytes | None = None
+) -> tuple[str, str]:
+    """Save image bytes to OUTPUT_DIR along with a 256x256 thumbnail.
+
+    Pass *thumbnail_bytes* when the thumbnail was already rendered elsewhere
+    (e.g. in the CPU pool); otherwise it is generated inline.
 
     Returns a tuple of (output_path, thumbnail_path) as relative paths.
     """
-    output_dir = settings.output_path
     unique_id = uuid.uuid4().hex
-    filename = f"{prefix}_{unique_id}.png"
-    thumb_filename = f"{prefix}_{unique_id}_thumb.png"
+    output_path = str(Path(settings.OUTPUT_DIR) / f"{prefix}_{unique_id}.png")
+    thumbnail_path = str(Path(settings.OUTPUT_DIR) / f"{prefix}_{unique_id}_thumb.png")
 
-    output_file = output_dir / filename
-    thumb_file = output_dir / thumb_filename
+    if thumbnail_bytes is None:
+        thumbnail_bytes = make_thumbnail(image_bytes, THUMBNAIL_SIZE)
 
-    output_file.write_bytes(image_bytes)
+    await storage.write(output_path, image_bytes)
+    try:
+        await storage.write(thumbnail_path, thumbnail_bytes)
+    except BaseException:
+        # Nothing references the image yet; do not leave it behind
+        await storage.delete(output_path)
+        raise
+    return output_path, thumbnail_path
 
-    img = Image.open(io.BytesIO(image_bytes))
-    img.thumbnail(THUMBNAIL_SIZE)
-    img.save(thumb_file, format="PNG")
 
-    return str(Path(settings.OUTPUT_DIR) / filename), str(Path(settings.OUTPUT_DIR) / thumb_filename)
+async def save_output(data: bytes, prefix: str, suffix: str = ".png") -> str:
+    """Save an auxiliary output file (e.g. a packed atlas) to OUTPUT_DIR.
 
+    Returns relative path to the saved file.
+    """
+    path = str(Path(settings.OUTPUT_DIR) / f"{prefix}_{uuid.uuid4().hex}{suffix}")
+    await storage.write(path, data)
+    return path
 
-def save_upload(file_bytes: bytes, original_filename: str) -> str:
-    """Save uploaded reference image to UPLOAD_DIR with UUID prefix.
 
-    Returns relative path to the saved file.
+async def save_upload(file_bytes: bytes, original_filename: str) -> str:
+    """Save uploaded reference image bytes to UPLOAD_DIR under their content hash.
+
+    Identical files are stored once. Returns relative path to the saved file.
     """
-    upload_dir = settings.upload_path
-    unique_id = uuid.uuid4().hex
-    safe_name = Path(original_filename).name
-    filename = f"{unique_id}_{safe_name}"
+    filename = _content_filename(
+        hashlib.sha256(file_bytes).hexdigest(), original_filename
+    )
+    path = str(Path(settings.UPLOAD_DIR) / filename)
+    file_reaper.cancel(path)
+    if not await storage.exists(path):
+        await storage.write(path, file_bytes)
+    return path
 
-    upload_file = upload_dir / filename
-    upload_file.write_bytes(file_bytes)
 
-    return str(Path(settings.UPLOAD_DIR) / filename)
+async def save_upload_stream(
+    source: AsyncReadable, original_filename: str, max_bytes: int
+) -> str:
+    """Stream an upload to UPLOAD_DIR in chunks, stored under its content hash.
 
+    The size limit is enforced and the SHA-256 computed as chunks are spooled
+    to a local temporary file, so the whole file is never held in memory; the
+    spooled file is then moved into storage. Identical files are stored once.
 
-def delete_files(*paths: str) -> None:
+    Returns relative path to the saved file.
+
+    Raises:
+        UploadTooLargeError: If the stream is larger than *max_bytes*.
+    """
+    await aiofiles.os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    tmp_file = Path(settings.UPLOAD_DIR) / f".{uuid.uuid4().hex}.part"
+    hasher = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(tmp_file, "wb") as out:
+            while chunk := await source.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                hasher.update(chunk)
+                await out.write(chunk)
+
+        filename = _content_filename(hasher.hexdigest(), original_filename)
+        path = str(Path(settings.UPLOAD_DIR) / filename)
+        file_reaper.cancel(path)
+        if await storage.exists(path):
+            await aiofiles.os.remove(tmp_file)
+        else:
+            await storage.write_file(path, tmp_file)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            await aiofiles.os.remove(tmp_file)
+        raise
+
+    return path
+
+
+def _content_filename(digest: str, original_filename: str) -> str:
+    suffix = Path(original_filename).suffix.lower()
+    if not suffix[1:].isalnum():
+        suffix = ".png"
+    return f"{digest}{suffix}"
+
+
+class StatCache:
+    """Per-process LRU of (resolved path, stat) for locally stored files.
+
+    Outputs and uploads are never modified after being written, so this
+    process invalidates entries on deletion (see ``delete_files``). Other
+    workers keep their own cache, so entries also expire after *ttl*
+    seconds; until then a file deleted or replaced elsewhere keeps its old
+    stat and ETag here. Files still pending in a write-behind spool are not
+    cached, as they are about to move, and neither are files queued for the
+    background reaper, whose stat would outlive them.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 4096) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Path, os.stat_result]] = OrderedDict()
+
+    async def lookup(self, relative_path: str) -> tuple[Path, os.stat_result] | None:
+        """Return (absolute path, stat) for a regular file, or None if missing."""
+        entry = self._entries.get(relative_path)
+        if entry is not None:
+            expires_at, full_path, st = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(relative_path)
+                return full_path, st
+            del self._entries[relative_path]
+
+        full_path = storage.local_path(relative_path)
+        if full_path is None:
+            return None
+        try:
+            st = await aiofiles.os.stat(full_path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        if (
+            storage.is_pending(relative_path)
+            or file_reaper.is_scheduled(relative_path)
+            or self.ttl <= 0
+        ):
+            return full_path, st
+        self._entries[relative_path] = (time.monotonic() + self.ttl, full_path, st)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return full_path, st
+
+    def invalidate(self, *relative_paths: str) -> None:
+        for rel_path in relative_paths:
+            self._entries.pop(rel_path, None)
+
+
+file_stats = StatCache(ttl=settings.FILE_STAT_CACHE_TTL)
+
+
+async def delete_files(*paths: str) -> None:
     """Delete files by their relative paths. Silently skip missing files."""
-    for rel_path in paths:
-        full_path = get_file_path(rel_path)
-        if full_path.is_file():
-            full_path.unlink()
+    await storage.delete(*paths)
+    file_stats.invalidate(*paths)
+
+
+async def schedule_delete(*paths: str) -> None:
+    """Hand files to the background reaper, which deletes them in batches."""
+    await file_reaper.schedule(*paths)
+    # After scheduling: from here on lookups do not cache these paths
+    file_stats.invalidate(*paths)
 
 
 def get_file_path(relative_path: str) -> Path:
-    """Resolve a relative path to an absolute path from the backend directory."""
+    """Resolve a relative path to an absolute path from the backend directory.
+
+    Only locally stored files exist at that path (see ``storage.local_path``).
+    """
     return Path(relative_path).resolve()
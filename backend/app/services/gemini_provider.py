@@ -1,10 +1,14 @@
-import base64
+from __future__ import annotations
 
-from google import genai
-from google.genai import types
+from typing import TYPE_CHECKING
 
 from app.config import settings
 
+if TYPE_CHECKING:
+    from google import genai
+
+    from app.services.reference_store import ReferenceImage
+
 AVAILABLE_MODELS = [
     {
         "id": "gemini-2.5-flash-image",
@@ -20,36 +24,50 @@ AVAILABLE_MODELS = [
 
 
 class GeminiProvider:
-    def __init__(self, api_key: str) -> None:
-        self._client = genai.Client(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str | None = None,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client: genai.Client | None = None
+
+    @property
+    def client(self) -> genai.Client:
+        """The SDK client, created on first use.
 
-    def generate(
+        google.genai is imported here rather than at module level: it is the
+        slowest import in the app and only needed once Gemini is called.
+        """
+        if self._client is None:
+            from google import genai
+            from google.genai import types
+
+            http_options = types.HttpOptions(base_url=self.base_url) if self.base_url else None
+            self._client = genai.Client(api_key=self.api_key, http_options=http_options)
+        return self._client
+
+    async def generate(
         self,
         prompt: str,
         model: str,
-        ref_image_b64: str | None = None,
+        reference: ReferenceImage | None = None,
         aspect_ratio: str = "1:1",
         image_size: str = "1K",
     ) -> bytes:
-        if ref_image_b64 is not None:
-            # Strip data-URL prefix so we have raw base64
-            raw_b64 = ref_image_b64
-            mime_type = "image/png"
-            if raw_b64.startswith("data:"):
-                header, raw_b64 = raw_b64.split(",", 1)
-                # e.g. "data:image/png;base64" -> "image/png"
-                mime_type = header.split(":")[1].split(";")[0]
-
-            image_bytes = base64.b64decode(raw_b64)
+        from google.genai import types
 
+        client = self.client
+        if reference is not None:
             contents = [
-                types.Part.from_bytes(data=image_bytes, mime_type=mime_type),
+                types.Part.from_bytes(data=reference.data, mime_type=reference.mime_type),
                 types.Part.from_text(text=prompt),
             ]
         else:
             contents = [prompt]
 
-        response = self._client.models.generate_content(
+        response = await client.aio.models.generate_content(
             model=model,
             contents=contents,
             config=types.GenerateContentConfig(
@@ -67,5 +85,13 @@ class GeminiProvider:
     def list_models(self) -> list[dict]:
         return list(AVAILABLE_MODELS)
 
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aio.aclose()
+            self._client = None
+
 
-gemini_provider = GeminiProvider(settings.GEMINI_API_KEY)
+gemini_provider = GeminiProvider(
+    settings.GEMINI_API_KEY,
+    base_url=settings.GEMINI_BASE_URL or None,
+)
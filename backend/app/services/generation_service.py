@@ -1,15 +1,43 @@
 import asyncio
-from datetime import datetime, timezone
+import base64
+import functools
+import json
+import logging
+import uuid
+from collections import Counter
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, func, desc, insert, or_, text, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.config import settings
+from app.database import async_session
 from app.models.generation import Generation
 from app.services.gemini_provider import gemini_provider
 from app.services.openrouter_provider import openrouter_provider
-from app.services import file_service
-from app.services.image_processor import remove_background
+from app.services import file_service, metrics
+from app.services.atlas_builder import build_atlas
+from app.services.cpu_pool import cpu_pool
+from app.services.derivative_service import derivative_service
+from app.services.image_processor import (
+    assemble_sprite_sheet,
+    make_thumbnail,
+    remove_background,
+)
+from app.services.job_queue import generation_queue
+from app.services.progress import progress_broker
+from app.services.resilience import provider_caller
+from app.services.scheduler import Priority, provider_scheduler
+from app.services.reference_store import ReferenceImage, reference_store
+from app.services.response_cache import response_cache
+from app.services.result_cache import CachedResult, make_cache_key, result_cache
 from app.utils.prompt_builder import build_game_asset_prompt as build_prompt
+from app.utils.prompt_builder import build_sprite_frame_prompt
+
+logger = logging.getLogger(__name__)
 
 
 async def create_generation(
@@ -25,8 +53,35 @@ async def create_generation(
     sprite_config: dict | None = None,
     reference_image_b64: str | None = None,
     reference_image_path: str | None = None,
+    background: bool = False,
+    bypass_cache: bool = False,
 ) -> Generation:
+    """Create a generation record and run it.
+
+    With *background* the record is committed as ``pending`` and handed to the
+    worker pool; the caller gets it back immediately and polls for the result.
+    Otherwise the generation runs inline and the finished record is returned.
+    *bypass_cache* skips the result cache to force a fresh variation. The
+    request is admitted to the provider scheduler as interactive work.
+
+    *db* is only used for the short INSERT of the record; no connection is
+    held while the provider runs, so slow generations do not drain the pool.
+
+    A reference is given either as *reference_image_path* (a file from
+    /api/upload-reference) or inline as *reference_image_b64*, which is saved
+    to UPLOAD_DIR so the record always carries a reference_image_path.
+
+    Raises:
+        ValueError: If the reference image is invalid.
+        FileNotFoundError: If *reference_image_path* does not exist.
+        SchedulerBusyError: If the provider/model backlog is full.
+    """
+    reference_image_path = await _resolve_reference(reference_image_b64, reference_image_path)
+    generation_id = str(uuid.uuid4())
+    provider_scheduler.admit(provider, model, Priority.INTERACTIVE, [generation_id])
+
     gen = Generation(
+        id=generation_id,
         prompt=prompt,
         negative_prompt=negative_prompt,
         model=model,
@@ -37,61 +92,536 @@ async def create_generation(
         is_sprite_sheet=is_sprite_sheet,
         sprite_config=sprite_config,
         reference_image_path=reference_image_path,
-        status="generating",
+        status="pending" if background else "generating",
     )
-    db.add(gen)
-    await db.commit()
-    await db.refresh(gen)
+    try:
+        db.add(gen)
+        await _commit(db)
+
+        if background:
+            progress_broker.publish(gen.id, "queued")
+            # The worker releases the admission once the generation is done
+            generation_queue.submit(
+                functools.partial(process_generation, gen.id, bypass_cache),
+                on_abandon=functools.partial(fail_interrupted, gen.id),
+            )
+            return gen
+    except BaseException:
+        provider_scheduler.release(generation_id)
+        raise
+
+    try:
+        await _run_generation(gen, bypass_cache)
+    finally:
+        provider_scheduler.release(generation_id)
+    return gen
+
+
+async def _resolve_reference(
+    reference_image_b64: str | None, reference_image_path: str | None
+) -> str | None:
+    """Return the upload path of the request's reference image, if any.
+
+    An existing path is validated (and warms the reference cache for the
+    provider call); inline base64 is saved to UPLOAD_DIR first.
+    """
+    if reference_image_path:
+        await reference_store.load(reference_image_path)
+        return reference_image_path
+    if reference_image_b64:
+        return await reference_store.save(ReferenceImage.from_base64(reference_image_b64))
+    return None
+
+
+async def create_batch(
+    db: AsyncSession,
+    prompts: list[str],
+    model: str,
+    provider: str,
+    negative_prompt: str | None = None,
+    aspect_ratio: str = "1:1",
+    image_size: str = "1024x1024",
+    transparent_bg: bool = False,
+    reference_image_b64: str | None = None,
+    reference_image_path: str | None = None,
+    bypass_cache: bool = False,
+) -> tuple[str, list[str]]:
+    """Insert one pending generation per prompt and queue them as a batch.
+
+    All rows go in with a single INSERT; the batch then runs as one job on the
+    worker pool (see ``run_batch``) as bulk work, behind interactive requests.
+    Returns (batch_id, generation_ids).
+
+    Raises:
+        ValueError: If the reference image is invalid.
+        FileNotFoundError: If *reference_image_path* does not exist.
+        SchedulerBusyError: If the provider/model backlog cannot take the batch.
+    """
+    reference_image_path = await _resolve_reference(reference_image_b64, reference_image_path)
+    batch_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "batch_id": batch_id,
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "model": model,
+            "provider": provider,
+            "aspect_ratio": aspect_ratio,
+            "image_size": image_size,
+            "transparent_bg": transparent_bg,
+            "is_sprite_sheet": False,
+            "reference_image_path": reference_image_path,
+            "status": "pending",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for prompt in prompts
+    ]
+    generation_ids = [row["id"] for row in rows]
+    provider_scheduler.admit(provider, model, Priority.BULK, generation_ids)
 
     try:
-        enhanced_prompt = build_prompt(
-            prompt,
-            negative_prompt=negative_prompt,
-            transparent_bg=transparent_bg,
-            is_sprite_sheet=is_sprite_sheet,
-            sprite_config=sprite_config,
+        await db.execute(insert(Generation), rows)
+        await _commit(db)
+        for generation_id in generation_ids:
+            progress_broker.publish(generation_id, "queued", batch_id=batch_id)
+        generation_queue.submit(
+            functools.partial(run_batch, batch_id, bypass_cache),
+            on_abandon=functools.partial(fail_interrupted, *generation_ids),
         )
+    except BaseException:
+        provider_scheduler.release(*generation_ids)
+        raise
+    return batch_id, generation_ids
 
-        if provider == "gemini":
-            image_bytes = await asyncio.to_thread(
-                gemini_provider.generate,
-                enhanced_prompt,
-                model,
-                reference_image_b64,
-                aspect_ratio,
-                image_size,
+
+async def run_batch(batch_id: str, bypass_cache: bool = False) -> None:
+    """Worker entry point: run a batch's generations with bounded fan-out.
+
+    At most BATCH_CONCURRENCY generations run at once. Outcomes are written
+    back with bulk UPDATEs every BATCH_FLUSH_SIZE completions, each in its
+    own session; when one fails, its generations are marked failed and the
+    rest of the batch carries on. A prompt that appears more than once (e.g.
+    variations) skips the result cache, which would otherwise hand every
+    copy the same image.
+    """
+    async with async_session() as db:
+        result = await db.execute(
+            select(Generation).where(
+                Generation.batch_id == batch_id, Generation.status == "pending"
+            )
+        )
+        gens = list(result.scalars().all())
+        if not gens:
+            return
+
+        await db.execute(
+            update(Generation)
+            .where(Generation.id.in_([g.id for g in gens]))
+            .values(status="generating", updated_at=datetime.now(timezone.utc))
+        )
+        await _commit(db)
+
+    prompt_counts = Counter(gen.prompt for gen in gens)
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    flush_lock = asyncio.Lock()
+    pending_updates: list[dict] = []
+
+    async def flush() -> None:
+        async with flush_lock:
+            if not pending_updates:
+                return
+            batch = pending_updates[:]
+            pending_updates.clear()
+            try:
+                async with async_session() as db:
+                    await db.execute(update(Generation), batch)
+                    await _commit(db)
+            except Exception as e:
+                logger.exception(f"Could not save {len(batch)} results of batch {batch_id}")
+                await _fail_generations(
+                    [updates["id"] for updates in batch], f"Could not save result: {e}"
+                )
+                return
+            for updates in batch:
+                _publish_outcome(updates["id"], updates)
+
+    async def run_one(gen: Generation) -> None:
+        try:
+            async with semaphore:
+                updates = await _execute_generation(
+                    gen, bypass_cache or prompt_counts[gen.prompt] > 1
+                )
+        finally:
+            provider_scheduler.release(gen.id)
+        pending_updates.append({"id": gen.id, **updates})
+        if len(pending_updates) >= settings.BATCH_FLUSH_SIZE:
+            await flush()
+
+    try:
+        await asyncio.gather(*(run_one(gen) for gen in gens))
+        await flush()
+    finally:
+        provider_scheduler.release(*(gen.id for gen in gens))
+
+
+INTERRUPTED_MESSAGE = "Interrupted before completion (server shutdown or restart)"
+
+
+async def fail_interrupted(*generation_ids: str) -> None:
+    """Mark generations that will never finish as failed.
+
+    Used for queued jobs abandoned at shutdown; records that already
+    reached a final state are left alone.
+    """
+    provider_scheduler.release(*generation_ids)
+    await _fail_generations(generation_ids, INTERRUPTED_MESSAGE)
+
+
+async def _fail_generations(generation_ids: Sequence[str], error: str) -> None:
+    """Mark unfinished generations failed in a fresh session and publish it.
+
+    Errors are logged, not raised: the records are then left to the startup
+    sweep of stale generations.
+    """
+    try:
+        async with async_session() as db:
+            result = await db.execute(
+                update(Generation)
+                .where(
+                    Generation.id.in_(generation_ids),
+                    Generation.status.in_(("pending", "generating")),
+                )
+                .values(
+                    status="failed",
+                    error_message=error,
+                    updated_at=datetime.now(timezone.utc),
+                )
+                .returning(Generation.id)
+            )
+            failed = list(result.scalars().all())
+            await _commit(db)
+    except Exception:
+        logger.exception(f"Could not mark {len(generation_ids)} generations failed")
+        return
+    for generation_id in failed:
+        progress_broker.publish(generation_id, "failed", error=error)
+
+
+async def fail_stale_generations(older_than: float) -> int:
+    """Fail pending/generating records not updated for *older_than* seconds.
+
+    Run at startup to give a final state to generations whose process died
+    without shutting down cleanly. Returns the number of records failed.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=older_than)
+    async with async_session() as db:
+        result = await db.execute(
+            update(Generation)
+            .where(
+                Generation.status.in_(("pending", "generating")),
+                Generation.updated_at < cutoff,
+            )
+            .values(
+                status="failed",
+                error_message=INTERRUPTED_MESSAGE,
+                updated_at=datetime.now(timezone.utc),
+            )
+        )
+        await _commit(db)
+    return result.rowcount
+
+
+async def get_batch_progress(db: AsyncSession, batch_id: str) -> dict[str, int]:
+    """Return generation counts by status for a batch (empty if unknown)."""
+    result = await db.execute(
+        select(Generation.status, func.count(Generation.id))
+        .where(Generation.batch_id == batch_id)
+        .group_by(Generation.status)
+    )
+    return {status: count for status, count in result.all()}
+
+
+async def process_generation(generation_id: str, bypass_cache: bool = False) -> None:
+    """Worker entry point: claim a queued generation and run it."""
+    try:
+        async with async_session() as db:
+            gen = await get_generation(db, generation_id)
+            if gen is None or gen.status != "pending":
+                return
+
+            gen.status = "generating"
+            gen.updated_at = datetime.now(timezone.utc)
+            await _commit(db)
+
+        await _run_generation(gen, bypass_cache)
+    finally:
+        provider_scheduler.release(generation_id)
+
+
+async def _run_generation(gen: Generation, bypass_cache: bool = False) -> None:
+    """Execute the generation and persist the outcome on *gen*.
+
+    The provider phase runs without a database connection; the outcome is
+    written afterwards with one UPDATE in its own short transaction.
+    """
+    updates = await _execute_generation(gen, bypass_cache)
+    try:
+        async with async_session() as db:
+            await db.execute(
+                update(Generation).where(Generation.id == gen.id).values(**updates)
+            )
+            await _commit(db)
+    except Exception as e:
+        _publish_save_failure(gen.id, e)
+        raise
+    _publish_outcome(gen.id, updates)
+    # Mirror the stored values without marking *gen* dirty in its session
+    for field, value in updates.items():
+        set_committed_value(gen, field, value)
+
+
+def _publish_outcome(generation_id: str, updates: dict) -> None:
+    """Publish the terminal progress event, once the outcome is persisted."""
+    if updates["status"] == "completed":
+        progress_broker.publish(
+            generation_id,
+            "completed",
+            output_image_path=updates["output_image_path"],
+            thumbnail_path=updates["thumbnail_path"],
+            cache_hit=bool((updates["metadata_json"] or {}).get("cache_hit")),
+        )
+    else:
+        progress_broker.publish(generation_id, "failed", error=updates["error_message"])
+
+
+def _publish_save_failure(generation_id: str, error: Exception) -> None:
+    progress_broker.publish(generation_id, "failed", error=f"Could not save result: {error}")
+
+
+async def _execute_generation(gen: Generation, bypass_cache: bool = False) -> dict:
+    """Build the prompt, then produce the image or reuse a cached result.
+
+    Does not touch the database; returns the column updates describing the
+    outcome (completed or failed) for the caller to persist.
+    """
+    metrics.generations_in_flight.inc()
+    progress_broker.publish(gen.id, "started", provider=gen.provider, model=gen.model)
+    try:
+        with metrics.stage("prompt_build"):
+            enhanced_prompt = build_prompt(
+                gen.prompt,
+                negative_prompt=gen.negative_prompt,
+                transparent_bg=gen.transparent_bg,
+                is_sprite_sheet=gen.is_sprite_sheet,
+                sprite_config=gen.sprite_config,
             )
-        elif provider == "openrouter":
-            image_bytes = await openrouter_provider.generate(
+        progress_broker.publish(gen.id, "prompt_built")
+
+        reference = None
+        if gen.reference_image_path:
+            reference = await reference_store.load(gen.reference_image_path)
+
+        async def produce() -> CachedResult:
+            return await _produce_image(gen, enhanced_prompt, reference)
+
+        cache_hit = False
+        if settings.RESULT_CACHE_ENABLED and not bypass_cache:
+            key = make_cache_key(
                 enhanced_prompt,
-                model,
-                reference_image_b64,
-                aspect_ratio,
-                image_size,
+                gen.model,
+                gen.provider,
+                gen.image_size,
+                gen.aspect_ratio,
+                gen.transparent_bg,
+                reference.digest if reference else None,
+                options={"atlas": _wants_atlas(gen)},
             )
+            result, cache_hit = await result_cache.get_or_create(key, produce)
         else:
+            result = await produce()
+
+        metadata = {**(gen.metadata_json or {}), **(result.metadata or {})}
+        if cache_hit:
+            metadata["cache_hit"] = True
+        metrics.generations_total.labels("completed", "").inc()
+        return {
+            "metadata_json": metadata or None,
+            "output_image_path": result.output_path,
+            "thumbnail_path": result.thumbnail_path,
+            "status": "completed",
+            "updated_at": datetime.now(timezone.utc),
+        }
+
+    except Exception as e:
+        metrics.generations_total.labels("failed", type(e).__name__).inc()
+        return {
+            "status": "failed",
+            "error_message": str(e),
+            "updated_at": datetime.now(timezone.utc),
+        }
+    finally:
+        metrics.generations_in_flight.dec()
+
+
+async def _produce_image(
+    gen: Generation, enhanced_prompt: str, reference: ReferenceImage | None
+) -> CachedResult:
+    """Call the provider, post-process and save the output files."""
+    sprite_config = gen.sprite_config or {}
+    if gen.is_sprite_sheet and sprite_config.get("mode") == "per_frame":
+        frames = await _generate_frames(gen, reference)
+        with metrics.stage("sprite_assembly"):
+            image_bytes = await cpu_pool.run(
+                assemble_sprite_sheet,
+                frames,
+                sprite_config.get("cols", 4),
+                sprite_config.get("rows", 4),
+            )
+        progress_broker.publish(gen.id, "frames_assembled", frames=len(frames))
+    else:
+        image_bytes = await _call_provider(gen, enhanced_prompt, reference)
+
+    if gen.transparent_bg:
+        with metrics.stage("background_removal"):
+            image_bytes = await cpu_pool.run(remove_background, image_bytes)
+        progress_broker.publish(gen.id, "background_removed")
+
+    with metrics.stage("thumbnail"):
+        thumbnail_bytes = await cpu_pool.run(
+            make_thumbnail, image_bytes, file_service.THUMBNAIL_SIZE
+        )
+
+    # Built before anything is saved: build_atlas rejects sheets it cannot
+    # pack, and a failure must not leave untracked files behind
+    atlas = None
+    if _wants_atlas(gen):
+        with metrics.stage("atlas_build"):
+            atlas = await cpu_pool.run(
+                build_atlas,
+                image_bytes,
+                sprite_config.get("cols", 4),
+                sprite_config.get("rows", 4),
+                sprite_config.get("frame_count", 16),
+                settings.ATLAS_PADDING,
+                settings.ATLAS_MAX_SIZE,
+            )
+
+    with metrics.stage("file_save"):
+        output_path, thumbnail_path = await file_service.save_image(
+            image_bytes, prefix="gen", thumbnail_bytes=thumbnail_bytes
+        )
+        result = CachedResult(output_path, thumbnail_path)
+        if atlas is not None:
+            atlas_bytes, frame_map = atlas
+            try:
+                atlas_path = await file_service.save_output(atlas_bytes, prefix="atlas")
+            except BaseException:
+                await file_service.schedule_delete(output_path, thumbnail_path)
+                raise
+            result.extra_paths = (atlas_path,)
+            result.metadata = {"atlas": {"image_path": atlas_path, **frame_map}}
+
+    progress_broker.publish(gen.id, "saved", output_image_path=output_path)
+    return result
+
+
+def _wants_atlas(gen: Generation) -> bool:
+    return bool(gen.is_sprite_sheet and (gen.sprite_config or {}).get("export_atlas"))
+
+
+async def _call_provider(
+    gen: Generation, prompt: str, reference: ReferenceImage | None
+) -> bytes:
+    """Call the generation's provider through the retry/circuit/failover layer.
+
+    Every attempt, including retries and failover calls, waits for a slot
+    from the provider scheduler; batch items queue behind interactive work.
+    """
+    priority = Priority.BULK if gen.batch_id else Priority.INTERACTIVE
+
+    async def request(provider: str, model: str) -> bytes:
+        if provider not in ("gemini", "openrouter"):
             raise ValueError(f"Unknown provider: {provider}")
+        async with provider_scheduler.slot(provider, model, priority):
+            progress_broker.publish(
+                gen.id, "provider_request_sent", provider=provider, model=model
+            )
+            with metrics.provider_call_seconds.labels(provider, model).time():
+                if provider == "gemini":
+                    image_bytes = await gemini_provider.generate(
+                        prompt,
+                        model,
+                        reference,
+                        gen.aspect_ratio,
+                        gen.image_size,
+                    )
+                else:
+                    image_bytes = await openrouter_provider.generate(
+                        prompt,
+                        model,
+                        reference,
+                        gen.aspect_ratio,
+                        gen.image_size,
+                    )
+        progress_broker.publish(
+            gen.id, "provider_response_received", provider=provider, bytes=len(image_bytes)
+        )
+        return image_bytes
 
-        if transparent_bg:
-            image_bytes = remove_background(image_bytes)
+    return await provider_caller.call(gen.provider, gen.model, request)
 
-        output_path, thumbnail_path = file_service.save_image(image_bytes, prefix="gen")
 
-        gen.output_image_path = output_path
-        gen.thumbnail_path = thumbnail_path
-        gen.status = "completed"
-        gen.updated_at = datetime.now(timezone.utc)
-        await db.commit()
-        await db.refresh(gen)
+async def _generate_frames(
+    gen: Generation, reference: ReferenceImage | None
+) -> list[bytes]:
+    """Generate each sprite frame with its own provider call, concurrently.
 
-    except Exception as e:
-        gen.status = "failed"
-        gen.error_message = str(e)
-        gen.updated_at = datetime.now(timezone.utc)
-        await db.commit()
-        await db.refresh(gen)
+    At most SPRITE_FRAME_CONCURRENCY calls run at once, capped at the
+    scheduler's in-flight limit for the model so frames do not queue behind
+    each other there. Retries are left to the provider caller. Frames come
+    back in index order; if any frame fails the remaining calls are cancelled.
+    """
+    cfg = gen.sprite_config or {}
+    cols, rows = cfg.get("cols", 4), cfg.get("rows", 4)
+    frame_count = min(cfg.get("frame_count", cols * rows), cols * rows)
+    semaphore = asyncio.Semaphore(
+        min(
+            settings.SPRITE_FRAME_CONCURRENCY,
+            provider_scheduler.concurrency(gen.provider, gen.model),
+        )
+    )
 
-    return gen
+    async def generate_frame(index: int) -> bytes:
+        prompt = build_sprite_frame_prompt(
+            gen.prompt,
+            index,
+            frame_count,
+            negative_prompt=gen.negative_prompt,
+            transparent_bg=gen.transparent_bg,
+        )
+        try:
+            async with semaphore:
+                return await _call_provider(gen, prompt, reference)
+        except Exception as e:
+            raise RuntimeError(f"Frame {index + 1} failed: {e}") from e
+
+    tasks = [asyncio.create_task(generate_frame(i)) for i in range(frame_count)]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def _commit(db: AsyncSession) -> None:
+    """Commit a generation write; every write in this module goes through here."""
+    with metrics.stage("db_commit"):
+        await db.commit()
+    response_cache.invalidate("history")
 
 
 async def get_generation(db: AsyncSession, generation_id: str) -> Generation | None:
@@ -105,27 +635,110 @@ async def list_generations(
     page_size: int = 20,
     provider: str | None = None,
     search: str | None = None,
-) -> tuple[list[Generation], int]:
+    cursor: str | None = None,
+    total_mode: str = "exact",
+    sort: str = "recent",
+) -> tuple[list[Generation], int | None, str | None]:
+    """List generations newest first, or by search relevance.
+
+    With *cursor* (the ``next_cursor`` of a previous page) the page is fetched
+    by keyset on (created_at, id) and *page* is ignored; otherwise OFFSET
+    pagination is used. *total_mode* is "exact", "estimate" (planner row count
+    when unfiltered) or "none".
+
+    *search* is a substring match served by the pg_trgm GIN index from
+    migration 003. ``sort="relevance"`` orders matches by trigram word
+    similarity; it needs the pg_trgm extension and uses OFFSET pagination.
+
+    Returns (items, total, next_cursor).
+    """
+    by_relevance = sort == "relevance" and bool(search)
+    if by_relevance and cursor:
+        raise ValueError("cursor pagination is not supported with relevance sort")
+
     query = select(Generation)
-    count_query = select(func.count(Generation.id))
+    filters = []
 
     if provider:
-        query = query.where(Generation.provider == provider)
-        count_query = count_query.where(Generation.provider == provider)
+        filters.append(Generation.provider == provider)
 
     if search:
-        query = query.where(Generation.prompt.ilike(f"%{search}%"))
-        count_query = count_query.where(Generation.prompt.ilike(f"%{search}%"))
+        filters.append(
+            Generation.prompt.ilike(f"%{_escape_like(search)}%", escape="\\")
+        )
 
-    total = (await db.execute(count_query)).scalar() or 0
+    if filters:
+        query = query.where(*filters)
 
-    query = query.order_by(desc(Generation.created_at))
-    query = query.offset((page - 1) * page_size).limit(page_size)
+    total = await _count_generations(db, filters, total_mode)
+
+    if by_relevance:
+        query = query.order_by(
+            desc(func.word_similarity(search, Generation.prompt)),
+            desc(Generation.created_at),
+            desc(Generation.id),
+        )
+    else:
+        query = query.order_by(desc(Generation.created_at), desc(Generation.id))
+
+    if cursor:
+        created_at, last_id = _decode_cursor(cursor)
+        query = query.where(
+            tuple_(Generation.created_at, Generation.id) < (created_at, last_id)
+        )
+    else:
+        query = query.offset((page - 1) * page_size)
+    query = query.limit(page_size)
 
     result = await db.execute(query)
     items = list(result.scalars().all())
 
-    return items, total
+    next_cursor = None
+    if len(items) == page_size and not by_relevance:
+        next_cursor = _encode_cursor(items[-1].created_at, items[-1].id)
+
+    return items, total, next_cursor
+
+
+async def _count_generations(
+    db: AsyncSession, filters: list, total_mode: str
+) -> int | None:
+    if total_mode == "none":
+        return None
+
+    if total_mode == "estimate" and not filters:
+        estimate = (
+            await db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"),
+                {"table": Generation.__tablename__},
+            )
+        ).scalar()
+        # reltuples is -1 (or 0) until the table has been analyzed
+        if estimate and estimate > 0:
+            return estimate
+
+    count_query = select(func.count(Generation.id))
+    if filters:
+        count_query = count_query.where(*filters)
+    return (await db.execute(count_query)).scalar() or 0
+
+
+def _escape_like(term: str) -> str:
+    """Escape LIKE wildcards so the search term matches literally."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _encode_cursor(created_at: datetime, generation_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), generation_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, generation_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(created_at), str(generation_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
 
 
 async def delete_generation(db: AsyncSession, generation_id: str) -> bool:
@@ -141,9 +754,45 @@ async def delete_generation(db: AsyncSession, generation_id: str) -> bool:
     if gen.reference_image_path:
         paths_to_delete.append(gen.reference_image_path)
 
+    # Cache hits share files with the generation that produced them
+    paths_to_delete = await _unshared_paths(db, gen.id, paths_to_delete)
+    # The atlas is only ever shared together with its sheet
+    atlas_path = ((gen.metadata_json or {}).get("atlas") or {}).get("image_path")
+    if atlas_path and gen.output_image_path in paths_to_delete:
+        paths_to_delete.append(atlas_path)
     if paths_to_delete:
-        file_service.delete_files(*paths_to_delete)
+        await file_service.schedule_delete(*paths_to_delete)
+        result_cache.invalidate_paths(*paths_to_delete)
+        reference_store.discard(*paths_to_delete)
+        for path in paths_to_delete:
+            await derivative_service.discard_source(Path(path).parent.name, Path(path).name)
 
     await db.delete(gen)
-    await db.commit()
+    await _commit(db)
     return True
+
+
+async def _unshared_paths(
+    db: AsyncSession, generation_id: str, paths: list[str]
+) -> list[str]:
+    """Return the subset of *paths* not referenced by any other generation.
+
+    Each path column is indexed (migration 005), so this is index lookups
+    rather than a scan of the table.
+    """
+    if not paths:
+        return []
+    query = select(
+        Generation.output_image_path,
+        Generation.thumbnail_path,
+        Generation.reference_image_path,
+    ).where(
+        Generation.id != generation_id,
+        or_(
+            Generation.output_image_path.in_(paths),
+            Generation.thumbnail_path.in_(paths),
+            Generation.reference_image_path.in_(paths),
+        ),
+    )
+    shared = {p for row in (await db.execute(query)).all() for p in row}
+    return [p for p in paths if p not in shared]
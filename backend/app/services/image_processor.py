@@ -1,22 +1,48 @@
+"""Pillow transforms, mostly run in cpu_pool worker processes.
+
+Pillow is imported inside each function so importing the app stays cheap.
+"""
 import io
 
-from PIL import Image
 
+def _channel_lut(predicate) -> list[int]:
+    """Build a 256-entry lookup table mapping matching channel values to 255."""
+    return [255 if predicate(v) else 0 for v in range(256)]
+
+
+def remove_background(
+    image_bytes: bytes,
+    threshold: int = 240,
+    key_color: tuple[int, int, int] | None = None,
+    tolerance: int = 0,
+) -> bytes:
+    """Remove a flat background colour by setting matching pixels to transparent.
 
-def remove_background(image_bytes: bytes, threshold: int = 240) -> bytes:
-    """Remove near-white background by setting matching pixels to transparent.
+    By default pixels where R, G, and B are all above *threshold* (near-white)
+    get alpha set to 0. When *key_color* is given, pixels whose channels are
+    each within *tolerance* of the key colour are removed instead.
 
-    Pixels where R, G, and B are all above *threshold* get alpha set to 0.
+    The mask is built per band with lookup tables, so the work happens inside
+    Pillow rather than in a Python loop over every pixel.
     """
+    from PIL import Image, ImageChops
+
     img = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
-    pixdata = img.load()
+    r, g, b, a = img.split()
+
+    if key_color is None:
+        luts = [_channel_lut(lambda v: v > threshold)] * 3
+    else:
+        luts = [
+            _channel_lut(lambda v, k=k: abs(v - k) <= tolerance) for k in key_color
+        ]
 
-    width, height = img.size
-    for y in range(height):
-        for x in range(width):
-            r, g, b, _a = pixdata[x, y]
-            if r > threshold and g > threshold and b > threshold:
-                pixdata[x, y] = (r, g, b, 0)
+    # 255 where every channel matches, 0 elsewhere
+    mask = ImageChops.multiply(
+        ImageChops.multiply(r.point(luts[0]), g.point(luts[1])),
+        b.point(luts[2]),
+    )
+    img.putalpha(ImageChops.subtract(a, mask))
 
     buf = io.BytesIO()
     img.save(buf, format="PNG")
@@ -30,6 +56,7 @@ def assemble_sprite_sheet(frames: list[bytes], cols: int, rows: int) -> bytes:
     """
     if not frames:
         raise ValueError("frames list must not be empty")
+    from PIL import Image
 
     images = [Image.open(io.BytesIO(f)).convert("RGBA") for f in frames]
     frame_w, frame_h = images[0].size
@@ -50,8 +77,43 @@ def assemble_sprite_sheet(frames: list[bytes], cols: int, rows: int) -> bytes:
     return buf.getvalue()
 
 
+def make_thumbnail(image_bytes: bytes, size: tuple[int, int] = (256, 256)) -> bytes:
+    """Downscale an image to fit within *size* and return it as PNG bytes."""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(image_bytes))
+    img.thumbnail(size)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def render_variant(image_bytes: bytes, width: int, fmt: str) -> bytes:
+    """Resize an image to *width* (never upscaling) and encode it as *fmt*.
+
+    *fmt* is "webp" or "png"; aspect ratio and alpha are preserved.
+    """
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+    if img.width > width:
+        height = max(1, round(img.height * width / img.width))
+        img = img.resize((width, height), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    if fmt == "webp":
+        img.save(buf, format="WEBP", quality=85, method=4)
+    else:
+        img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
 def add_transparency(image_bytes: bytes) -> bytes:
     """Convert image to RGBA format and return as PNG bytes."""
+    from PIL import Image
+
     img = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
     buf = io.BytesIO()
     img.save(buf, format="PNG")
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class GenerationQueue:
+    """In-process worker pool that runs queued generation jobs.
+
+    Jobs are zero-argument coroutine factories. ``start`` spawns the workers
+    and ``stop`` stops accepting new jobs, waits for queued ones to finish
+    (up to *drain_timeout* seconds) and then cancels the workers. Jobs that
+    were cancelled or never started get their *on_abandon* callback, so
+    their records can be given a final state.
+    """
+
+    def __init__(self, concurrency: int, drain_timeout: float) -> None:
+        self.concurrency = concurrency
+        self.drain_timeout = drain_timeout
+        self._queue: asyncio.Queue[tuple[Job, Job | None]] | None = None
+        self._workers: list[asyncio.Task] = []
+        # on_abandon callbacks of the jobs the workers are running
+        self._current: dict[int, Job | None] = {}
+        self._accepting = False
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"generation-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+        self._accepting = True
+        logger.info(f"Generation queue started with {self.concurrency} workers.")
+
+    def submit(self, job: Job, on_abandon: Job | None = None) -> None:
+        if not self._accepting or self._queue is None:
+            raise RuntimeError("Generation queue is not running")
+        self._queue.put_nowait((job, on_abandon))
+
+    async def stop(self) -> None:
+        if not self._workers:
+            return
+        self._accepting = False
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+            logger.info("Generation queue drained.")
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Generation queue drain timed out after {self.drain_timeout}s "
+                f"with {self._queue.qsize()} jobs still queued."
+            )
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        abandoned = list(self._current.values())
+        while not self._queue.empty():
+            abandoned.append(self._queue.get_nowait()[1])
+        abandoned = [callback for callback in abandoned if callback is not None]
+        if abandoned:
+            logger.warning(f"Abandoning {len(abandoned)} unfinished generation jobs.")
+        for callback in abandoned:
+            try:
+                await callback()
+            except Exception:
+                logger.exception("Failed to clean up an abandoned generation job")
+
+        self._workers = []
+        self._current = {}
+        self._queue = None
+
+    async def _worker(self, index: int) -> None:
+        assert self._queue is not None
+        while True:
+            job, on_abandon = await self._queue.get()
+            self._current[index] = on_abandon
+            try:
+                await job()
+            except Exception:
+                logger.exception(f"Generation worker {index} job failed")
+            finally:
+                self._queue.task_done()
+            # Not reached when the job is cancelled, so stop() sees it
+            del self._current[index]
+
+
+generation_queue = GenerationQueue(
+    concurrency=settings.GENERATION_WORKERS,
+    drain_timeout=settings.GENERATION_DRAIN_TIMEOUT,
+)
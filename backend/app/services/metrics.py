@@ -0,0 +1,54 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.database import pool_checked_out
+from app.services.cpu_pool import cpu_pool
+from app.services.job_queue import generation_queue
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PROVIDER_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+generation_stage_seconds = Histogram(
+    "generation_stage_seconds",
+    "Time spent in each generation stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+provider_call_seconds = Histogram(
+    "provider_call_seconds",
+    "Latency of individual provider calls, excluding scheduler wait",
+    ["provider", "model"],
+    buckets=PROVIDER_BUCKETS,
+)
+generations_total = Counter(
+    "generations_total",
+    "Finished generations by status and error class",
+    ["status", "error"],
+)
+generations_in_flight = Gauge(
+    "generations_in_flight",
+    "Generations currently executing",
+)
+http_request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"],
+)
+
+# Sampled at scrape time, so they cost nothing on the hot path
+Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out of the pool",
+).set_function(pool_checked_out)
+Gauge(
+    "cpu_pool_queue_depth",
+    "Jobs submitted to the image process pool that have not finished",
+).set_function(lambda: cpu_pool.queue_depth)
+Gauge(
+    "generation_queue_pending",
+    "Background jobs waiting for a generation worker",
+).set_function(generation_queue.pending)
+
+
+def stage(name: str):
+    """Context manager timing a block into generation_stage_seconds."""
+    return generation_stage_seconds.labels(name).time()
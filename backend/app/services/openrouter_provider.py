@@ -1,23 +1,86 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import importlib.util
+import logging
+from typing import TYPE_CHECKING
 
 import httpx
 
 from app.config import settings
 
+if TYPE_CHECKING:
+    from app.services.reference_store import ReferenceImage
+
+logger = logging.getLogger(__name__)
+
 OPENROUTER_API_URL = "https://api.openrouter.ai/api/v1/chat/completions"
+# Warm-up requests give up quickly: startup waits on them
+PRECONNECT_TIMEOUT = 5.0
 
 
 class OpenRouterProvider:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, api_url: str = OPENROUTER_API_URL):
         self.api_key = api_key
+        self.api_url = api_url
+        self._client: httpx.AsyncClient | None = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = settings.OPENROUTER_HTTP2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("OPENROUTER_HTTP2 is set but 'h2' is not installed; using HTTP/1.1.")
+            http2 = False
+
+        return httpx.AsyncClient(
+            timeout=settings.OPENROUTER_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.OPENROUTER_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENROUTER_MAX_KEEPALIVE,
+                keepalive_expiry=settings.OPENROUTER_KEEPALIVE_EXPIRY,
+            ),
+            http2=http2,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared pooled client, created on first use if startup() was skipped."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def startup(self, preconnect: int = 0) -> None:
+        """Create the shared client and optionally warm *preconnect* connections.
+
+        Warm-up failures, including timeouts after PRECONNECT_TIMEOUT seconds,
+        are logged and ignored; requests will simply open their own
+        connections.
+        """
+        client = self.client
+        if preconnect <= 0:
+            return
+
+        origin = httpx.URL(self.api_url).copy_with(path="/", query=None)
+        results = await asyncio.gather(
+            *(client.head(origin, timeout=PRECONNECT_TIMEOUT) for _ in range(preconnect)),
+            return_exceptions=True,
+        )
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            logger.warning(f"OpenRouter pre-connect failed: {failures[0]!r}")
+        else:
+            logger.info(f"OpenRouter pre-connected {preconnect} connection(s).")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def generate(
         self,
         prompt: str,
         model: str,
-        ref_image_b64: str | None = None,
+        reference: ReferenceImage | None = None,
         aspect_ratio: str = "1:1",
         image_size: str = "1024x1024",
     ) -> bytes:
@@ -26,7 +89,7 @@ class OpenRouterProvider:
         Args:
             prompt: Text description of the image to generate.
             model: Model identifier (e.g. "openai/gpt-image-1").
-            ref_image_b64: Optional base64-encoded reference image.
+            reference: Optional decoded reference image.
             aspect_ratio: Desired aspect ratio (e.g. "1:1", "16:9").
             image_size: Desired pixel dimensions (e.g. "1024x1024").
 
@@ -43,15 +106,9 @@ class OpenRouterProvider:
         }
 
         content_parts: list[dict] = []
-        if ref_image_b64:
-            clean_b64 = ref_image_b64
-            if "," in clean_b64:
-                clean_b64 = clean_b64.split(",", 1)[1]
+        if reference is not None:
             content_parts.append(
-                {
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/png;base64,{clean_b64}"},
-                }
+                {"type": "image_url", "image_url": {"url": reference.data_url}}
             )
         content_parts.append({"type": "text", "text": prompt})
 
@@ -65,12 +122,9 @@ class OpenRouterProvider:
             },
         }
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                OPENROUTER_API_URL, json=payload, headers=headers
-            )
-            response.raise_for_status()
-            data = response.json()
+        response = await self.client.post(self.api_url, json=payload, headers=headers)
+        response.raise_for_status()
+        data = response.json()
 
         message = data["choices"][0]["message"]
 
@@ -97,4 +151,7 @@ class OpenRouterProvider:
         ]
 
 
-openrouter_provider = OpenRouterProvider(settings.OPENROUTER_API_KEY)
+openrouter_provider = OpenRouterProvider(
+    settings.OPENROUTER_API_KEY,
+    api_url=settings.OPENROUTER_API_URL or OPENROUTER_API_URL,
+)
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from app.config import settings
+
+TERMINAL_STAGES = frozenset({"completed", "failed"})
+
+
+@dataclass
+class _Channel:
+    events: list[dict] = field(default_factory=list)
+    subscribers: set[asyncio.Queue] = field(default_factory=set)
+    started: float | None = None
+    last: float | None = None
+    finished_at: float | None = None
+
+
+class ProgressBroker:
+    """In-process pub/sub of generation progress events.
+
+    The generation pipeline publishes one event per stage transition; each
+    carries a sequence number, the time since the generation started
+    (elapsed_ms) and the time since the previous event (stage_ms). A
+    subscriber first receives the events already published, so it can attach
+    at any point, then live ones. Finished generations stay replayable for
+    *retention* seconds and at most *max_channels* generations are tracked.
+    Watchers only hold a queue, so idle ones cost memory and no queries.
+    Past *max_channels*, finished channels nobody watches go first; a watched
+    channel is only dropped when there is nothing else, and its watchers then
+    receive ``None`` to end their streams (clients reconnect and resubscribe).
+
+    Events are per process: a watcher connected to one worker does not see a
+    generation running in another.
+    """
+
+    def __init__(self, retention: float, max_channels: int) -> None:
+        self.retention = retention
+        self.max_channels = max_channels
+        self._channels: OrderedDict[str, _Channel] = OrderedDict()
+        # Finished generation ids in expiry order
+        self._finished: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def publish(self, generation_id: str, stage: str, **data) -> None:
+        channel = self._channels.get(generation_id)
+        if channel is None:
+            channel = self._channels[generation_id] = _Channel()
+        elif channel.finished_at is not None:
+            return
+
+        now = time.monotonic()
+        if channel.started is None:
+            channel.started = now
+        event = {
+            "generation_id": generation_id,
+            "seq": len(channel.events) + 1,
+            "stage": stage,
+            "at": datetime.now(timezone.utc).isoformat(),
+            "elapsed_ms": round((now - channel.started) * 1000, 1),
+            "stage_ms": round((now - (channel.last or now)) * 1000, 1),
+            **data,
+        }
+        channel.last = now
+        channel.events.append(event)
+        for queue in channel.subscribers:
+            queue.put_nowait(event)
+
+        if stage in TERMINAL_STAGES:
+            channel.finished_at = now
+            self._finished[generation_id] = now
+        self._prune(now)
+
+    def subscribe(self, generation_id: str, after: int = 0) -> asyncio.Queue:
+        """Return a queue of *generation_id*'s events with sequence above *after*.
+
+        The queue yields ``None`` if the channel is dropped while watched. Pass
+        the queue to ``unsubscribe`` when done.
+        """
+        channel = self._channels.get(generation_id)
+        if channel is None:
+            channel = self._channels[generation_id] = _Channel()
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in channel.events:
+            if event["seq"] > after:
+                queue.put_nowait(event)
+        channel.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, generation_id: str, queue: asyncio.Queue) -> None:
+        channel = self._channels.get(generation_id)
+        if channel is None:
+            return
+        channel.subscribers.discard(queue)
+        if not channel.subscribers and not channel.events:
+            del self._channels[generation_id]
+
+    def _prune(self, now: float) -> None:
+        while self._finished:
+            generation_id, finished_at = next(iter(self._finished.items()))
+            if now - finished_at <= self.retention:
+                break
+            del self._finished[generation_id]
+            self._channels.pop(generation_id, None)
+        while len(self._channels) > self.max_channels:
+            self._evict(self._eviction_candidate())
+
+    def _eviction_candidate(self) -> str:
+        """Oldest finished unwatched channel, else oldest unwatched, else oldest."""
+        for generation_id in self._finished:
+            if not self._channels[generation_id].subscribers:
+                return generation_id
+        for generation_id, channel in self._channels.items():
+            if not channel.subscribers:
+                return generation_id
+        return next(iter(self._channels))
+
+    def _evict(self, generation_id: str) -> None:
+        channel = self._channels.pop(generation_id)
+        self._finished.pop(generation_id, None)
+        for queue in channel.subscribers:
+            queue.put_nowait(None)
+
+
+progress_broker = ProgressBroker(
+    retention=settings.PROGRESS_RETENTION,
+    max_channels=settings.PROGRESS_MAX_CHANNELS,
+)
@@ -0,0 +1,109 @@
+import base64
+import hashlib
+import mimetypes
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+
+from app.config import settings
+from app.services import file_service
+from app.services.file_reaper import file_reaper
+from app.services.storage import storage
+
+
+@dataclass
+class ReferenceImage:
+    """Decoded reference image bytes, shared by every provider call that uses it."""
+
+    data: bytes
+    mime_type: str = "image/png"
+
+    @classmethod
+    def from_base64(cls, b64_string: str) -> "ReferenceImage":
+        """Decode raw base64 or a ``data:<mime>;base64,`` URL."""
+        mime_type = "image/png"
+        if b64_string.startswith("data:"):
+            header, b64_string = b64_string.split(",", 1)
+            # e.g. "data:image/png;base64" -> "image/png"
+            mime_type = header.split(":")[1].split(";")[0]
+        elif "," in b64_string:
+            b64_string = b64_string.split(",", 1)[1]
+        return cls(base64.b64decode(b64_string), mime_type)
+
+    @cached_property
+    def digest(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+    @cached_property
+    def data_url(self) -> str:
+        encoded = base64.b64encode(self.data).decode("ascii")
+        return f"data:{self.mime_type};base64,{encoded}"
+
+    @property
+    def extension(self) -> str:
+        return mimetypes.guess_extension(self.mime_type) or ".png"
+
+
+class ReferenceStore:
+    """Byte-bounded LRU of decoded reference images keyed by upload path.
+
+    Uploads are stored under their content hash, so a path always maps to the
+    same bytes and entries never go stale.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, ReferenceImage] = OrderedDict()
+        self._total_bytes = 0
+
+    async def load(self, relative_path: str) -> ReferenceImage:
+        """Return the reference image for a path returned by /api/upload-reference.
+
+        Raises:
+            ValueError: If the path points outside UPLOAD_DIR.
+            FileNotFoundError: If the file does not exist.
+        """
+        # Referenced again, so it must survive a pending delete (e.g. of an
+        # earlier generation that used it)
+        file_reaper.cancel(relative_path)
+        entry = self._entries.get(relative_path)
+        if entry is not None:
+            self._entries.move_to_end(relative_path)
+            return entry
+
+        full_path = file_service.get_file_path(relative_path)
+        if not full_path.is_relative_to(settings.upload_path.resolve()):
+            raise ValueError("Reference image must be an uploaded file")
+        try:
+            data = await storage.read(relative_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Reference image not found: {relative_path}")
+
+        mime_type = mimetypes.guess_type(full_path.name)[0] or "image/png"
+        entry = ReferenceImage(data, mime_type)
+        self.put(relative_path, entry)
+        return entry
+
+    def put(self, relative_path: str, reference: ReferenceImage) -> None:
+        if relative_path in self._entries:
+            return
+        self._entries[relative_path] = reference
+        self._total_bytes += len(reference.data)
+        while self._total_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= len(evicted.data)
+
+    def discard(self, *relative_paths: str) -> None:
+        for path in relative_paths:
+            evicted = self._entries.pop(path, None)
+            if evicted is not None:
+                self._total_bytes -= len(evicted.data)
+
+    async def save(self, reference: ReferenceImage) -> str:
+        """Persist an inline reference to UPLOAD_DIR and cache it; returns its path."""
+        path = await file_service.save_upload(reference.data, f"reference{reference.extension}")
+        self.put(path, reference)
+        return path
+
+
+reference_store = ReferenceStore(max_bytes=settings.REFERENCE_CACHE_MAX_BYTES)
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import random
+import sys
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ProviderCall = Callable[[str, str], Awaitable[bytes]]
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a provider/model circuit is open and the call is skipped."""
+
+
+def _retry_after(response: httpx.Response | None) -> float | None:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds."""
+    value = response.headers.get("retry-after") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def classify(error: Exception) -> tuple[bool, float | None]:
+    """Return (retryable, retry_after_seconds) for a provider error.
+
+    Rate limits (429), server errors (5xx) and transport failures are
+    retryable; anything else (bad request, malformed response) is not.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500, _retry_after(error.response)
+    if isinstance(error, httpx.TransportError):
+        return True, None
+    # The Gemini SDK is imported lazily; if it is not loaded yet, no error can
+    # have come from it
+    genai_errors = sys.modules.get("google.genai.errors")
+    if genai_errors is not None and isinstance(error, genai_errors.APIError):
+        response = error.response if isinstance(error.response, httpx.Response) else None
+        return error.code == 429 or (error.code or 0) >= 500, _retry_after(response)
+    return False, None
+
+
+def classify_for_failover(error: Exception) -> bool:
+    """Fail over on provider-health errors and open circuits, not bad requests."""
+    return isinstance(error, CircuitOpenError) or classify(error)[0]
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one provider/model.
+
+    After *failure_threshold* consecutive retryable failures the circuit opens
+    and calls are rejected for *reset_timeout* seconds; then a single trial
+    call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Free the half-open trial slot after a call that was cancelled or
+        aborted before it could tell anything about the provider."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class ResilientCaller:
+    """Retries, circuit breaking and failover around provider calls.
+
+    Each call is retried with jittered exponential backoff (honouring
+    Retry-After) while errors are retryable. A per provider/model circuit
+    breaker stops hammering a provider that keeps failing, and when the
+    primary gives up the call fails over to the configured equivalent model
+    on the other provider, if any. Counters are exposed through ``stats``.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        failure_threshold: int,
+        reset_timeout: float,
+        failover: dict[tuple[str, str], tuple[str, str]] | None = None,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failover = failover or {}
+        self.counters: Counter[tuple[str, str, str]] = Counter()
+        self._breakers: dict[tuple[str, str], CircuitBreaker] = {}
+
+    def breaker(self, provider: str, model: str) -> CircuitBreaker:
+        key = (provider, model)
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self._breakers[key]
+
+    async def call(self, provider: str, model: str, fn: ProviderCall) -> bytes:
+        """Run ``fn(provider, model)`` with retries, falling over if configured."""
+        try:
+            return await self._call_with_retries(provider, model, fn)
+        except Exception as primary_error:
+            target = self.failover.get((provider, model))
+            if target is None or not classify_for_failover(primary_error):
+                raise
+            logger.warning(
+                f"Failing over {provider}/{model} -> {target[0]}/{target[1]}: {primary_error}"
+            )
+            self.counters[(provider, model, "failovers")] += 1
+            return await self._call_with_retries(*target, fn)
+
+    async def _call_with_retries(self, provider: str, model: str, fn: ProviderCall) -> bytes:
+        breaker = self.breaker(provider, model)
+        for attempt in range(self.max_attempts):
+            if not breaker.allow():
+                self.counters[(provider, model, "rejected")] += 1
+                raise CircuitOpenError(f"Circuit open for {provider}/{model}")
+
+            self.counters[(provider, model, "calls")] += 1
+            try:
+                result = await fn(provider, model)
+            except Exception as e:
+                retryable, retry_after = classify(e)
+                if not retryable:
+                    # The provider answered; a bad request says nothing about its health
+                    breaker.record_success()
+                    self.counters[(provider, model, "errors")] += 1
+                    raise
+                breaker.record_failure()
+                self.counters[(provider, model, "failures")] += 1
+
+                delay = self._backoff(attempt, retry_after)
+                if attempt + 1 == self.max_attempts or delay is None:
+                    raise
+                self.counters[(provider, model, "retries")] += 1
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled mid-call: without this a half-open trial would stay
+                # in flight forever and lock the provider out
+                breaker.release_trial()
+                raise
+            else:
+                breaker.record_success()
+                self.counters[(provider, model, "successes")] += 1
+                return result
+        raise AssertionError("unreachable")
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float | None:
+        """Delay before the next attempt, or None if Retry-After is too long."""
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        ceiling = min(self.max_delay, self.base_delay * 2**attempt)
+        return random.uniform(ceiling / 2, ceiling)
+
+    def stats(self) -> list[dict]:
+        keys = {(p, m) for p, m, _ in self.counters} | set(self._breakers)
+        return [
+            {
+                "provider": provider,
+                "model": model,
+                "circuit": self.breaker(provider, model).state,
+                **{
+                    event: count
+                    for (p, m, event), count in self.counters.items()
+                    if (p, m) == (provider, model)
+                },
+            }
+            for provider, model in sorted(keys)
+        ]
+
+
+provider_caller = ResilientCaller(
+    max_attempts=settings.PROVIDER_RETRY_ATTEMPTS,
+    base_delay=settings.PROVIDER_RETRY_BASE_DELAY,
+    max_delay=settings.PROVIDER_RETRY_MAX_DELAY,
+    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+    failover=settings.provider_failover,
+)
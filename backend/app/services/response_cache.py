@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A serialized JSON body with its strong ETag."""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "CachedResponse":
+        return cls(body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+
+class ResponseCache:
+    """Per-process LRU of serialized API responses, with TTL and versioning.
+
+    Entries are grouped by namespace (e.g. "history"). ``invalidate`` bumps
+    the namespace's version; entries built under an older version are misses,
+    and so are builds still running when the version changed. The TTL bounds
+    staleness for writes this process does not see, such as those made by
+    other workers. Concurrent misses for the same key share one build.
+    When disabled every call builds afresh.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, enabled: bool = True) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._versions: Counter[str] = Counter()
+        self._entries: OrderedDict[tuple, tuple[int, float, CachedResponse]] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, namespace: str) -> None:
+        self._versions[namespace] += 1
+
+    async def get_or_build(
+        self,
+        namespace: str,
+        key: Hashable,
+        build: Callable[[], Awaitable[bytes]],
+        ttl: float | None = None,
+    ) -> CachedResponse:
+        """Return the cached response for *key*, or serialize a new one with *build*.
+
+        *ttl* overrides the default lifetime (``math.inf`` for static data).
+        """
+        if not self.enabled:
+            return CachedResponse.from_body(await build())
+
+        entry_key = (namespace, key)
+        version = self._versions[namespace]
+        entry = self._entries.get(entry_key)
+        if entry is not None:
+            entry_version, expires_at, response = entry
+            if entry_version == version and time.monotonic() < expires_at:
+                self._entries.move_to_end(entry_key)
+                return response
+            del self._entries[entry_key]
+
+        inflight_key = (entry_key, version)
+        inflight = self._inflight.get(inflight_key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            response = CachedResponse.from_body(await build())
+            future.set_result(response)
+        except BaseException as e:
+            future.set_exception(
+                e if isinstance(e, Exception) else RuntimeError("Response build was cancelled")
+            )
+            # Mark retrieved so a future nobody awaited does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[inflight_key]
+
+        # Written after the build, so data read before a concurrent write is
+        # only stored if no invalidation happened in between
+        if self._versions[namespace] == version:
+            lifetime = self.ttl if ttl is None else ttl
+            self._entries[entry_key] = (version, time.monotonic() + lifetime, response)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return response
+
+
+response_cache = ResponseCache(
+    ttl=settings.RESPONSE_CACHE_TTL,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+)
@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from app.config import settings
+from app.services.storage import storage
+
+
+@dataclass
+class CachedResult:
+    output_path: str
+    thumbnail_path: str
+    # Additional files produced alongside the output (e.g. a packed atlas)
+    extra_paths: tuple[str, ...] = ()
+    metadata: dict | None = None
+    size_bytes: int = 0
+
+    @property
+    def paths(self) -> tuple[str, ...]:
+        return (self.output_path, self.thumbnail_path, *self.extra_paths)
+
+
+def make_cache_key(
+    enhanced_prompt: str,
+    model: str,
+    provider: str,
+    image_size: str | None,
+    aspect_ratio: str | None,
+    transparent_bg: bool,
+    reference_digest: str | None = None,
+    options: dict | None = None,
+) -> str:
+    """Hash every input that affects the generated image into a cache key.
+
+    *options* carries any further output-affecting settings (e.g. atlas export).
+    """
+    payload = json.dumps(
+        [
+            enhanced_prompt,
+            model,
+            provider,
+            image_size,
+            aspect_ratio,
+            transparent_bg,
+            reference_digest,
+            options,
+        ],
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU of generated output files, keyed by request content.
+
+    Entries only point at files already saved in OUTPUT_DIR; eviction drops the
+    index entry and never deletes files, which belong to their generations.
+    Concurrent misses for the same key share a single in-flight call.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedResult] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> CachedResult | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        for path in entry.paths:
+            if not await storage.exists(path):
+                self._remove(key)
+                return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def put(self, key: str, entry: CachedResult) -> CachedResult:
+        entry.size_bytes = 0
+        for path in entry.paths:
+            entry.size_bytes += await storage.size(path) or 0
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._total_bytes += entry.size_bytes
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+        return entry
+
+    def invalidate_paths(self, *paths: str) -> None:
+        """Drop entries that reference any of *paths* (e.g. after deletion)."""
+        doomed = set(paths)
+        for key, entry in list(self._entries.items()):
+            if doomed.intersection(entry.paths):
+                self._remove(key)
+
+    async def get_or_create(
+        self, key: str, factory: Callable[[], Awaitable[CachedResult]]
+    ) -> tuple[CachedResult, bool]:
+        """Return (result, hit). On a miss *factory* produces the result.
+
+        Callers that arrive while the same key is being produced wait for that
+        call instead of starting their own, and count as hits.
+        """
+        entry = await self.get(key)
+        if entry is not None:
+            return entry, True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = await self.put(key, await factory())
+            future.set_result(entry)
+            return entry, False
+        except asyncio.CancelledError:
+            self._fail(future, RuntimeError("Coalesced generation was cancelled"))
+            raise
+        except Exception as e:
+            self._fail(future, e)
+            raise
+        finally:
+            del self._inflight[key]
+
+    @staticmethod
+    def _fail(future: asyncio.Future, error: Exception) -> None:
+        future.set_exception(error)
+        # Mark retrieved so a future nobody awaited does not log a warning
+        future.exception()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size_bytes
+
+
+result_cache = ResultCache(max_bytes=settings.RESULT_CACHE_MAX_BYTES)
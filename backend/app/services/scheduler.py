@@ -0,0 +1,221 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
+from enum import IntEnum
+
+from app.config import settings
+
+
+class Priority(IntEnum):
+    """Lower values are served first."""
+
+    INTERACTIVE = 0
+    BULK = 1
+
+
+class SchedulerBusyError(RuntimeError):
+    """Raised when a provider/model backlog is too deep to admit more work."""
+
+    def __init__(self, provider: str, model: str, queue_position: int, retry_after: int) -> None:
+        super().__init__(
+            f"{provider}/{model} is busy: request would be #{queue_position} in queue"
+        )
+        self.queue_position = queue_position
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills *rate_per_minute* tokens per minute, holding at most *capacity*.
+
+    A rate of 0 disables pacing.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int) -> None:
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Lane:
+    """Pacing, concurrency cap and waiters for one provider/model."""
+
+    def __init__(self, rpm: int, max_concurrency: int) -> None:
+        self.rpm = rpm
+        self.max_concurrency = max(1, max_concurrency)
+        # The bucket starts full, so a burst of up to max_concurrency calls
+        # goes out at once before pacing kicks in
+        self.bucket = TokenBucket(rpm, self.max_concurrency)
+        self.active = 0
+        self.waiting: list[tuple[int, int]] = []
+        self.backlog: Counter[Priority] = Counter()
+        self.avg_call_seconds = 0.0
+        self.changed = asyncio.Condition()
+
+    async def acquire(self, entry: tuple[int, int]) -> None:
+        async with self.changed:
+            heapq.heappush(self.waiting, entry)
+            try:
+                while True:
+                    delay = None
+                    if self.waiting[0] == entry and self.active < self.max_concurrency:
+                        delay = self.bucket.take()
+                        if delay == 0:
+                            break
+                    try:
+                        await asyncio.wait_for(self.changed.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.changed.notify_all()
+                raise
+            heapq.heappop(self.waiting)
+            self.active += 1
+            self.changed.notify_all()
+
+    async def release(self, elapsed: float) -> None:
+        self.active -= 1
+        # Exponential moving average feeding the queue wait estimate
+        self.avg_call_seconds = (
+            elapsed if not self.avg_call_seconds else 0.8 * self.avg_call_seconds + 0.2 * elapsed
+        )
+        async with self.changed:
+            self.changed.notify_all()
+
+    def estimated_wait(self, position: int) -> float:
+        """Seconds until *position* requests ahead have gone through."""
+        by_rate = position * 60 / self.rpm if self.rpm > 0 else 0.0
+        by_concurrency = position * self.avg_call_seconds / self.max_concurrency
+        return max(by_rate, by_concurrency)
+
+
+class ProviderScheduler:
+    """Paces provider calls and orders them by priority.
+
+    Each provider/model gets a token bucket (requests per minute) and an
+    in-flight cap. Calls wait in a priority queue, so interactive requests go
+    ahead of queued bulk work. Admission control tracks generations accepted
+    but not yet finished: once a new request would land beyond *max_backlog*
+    in its lane, ``admit`` raises ``SchedulerBusyError`` with the would-be
+    queue position and a wait estimate, instead of letting latency grow.
+    """
+
+    def __init__(
+        self,
+        rpm: int,
+        max_concurrency: int,
+        max_backlog: int,
+        model_rpm: dict[tuple[str, str], int] | None = None,
+        model_concurrency: dict[tuple[str, str], int] | None = None,
+    ) -> None:
+        self.rpm = rpm
+        self.max_concurrency = max_concurrency
+        self.max_backlog = max_backlog
+        self.model_rpm = model_rpm or {}
+        self.model_concurrency = model_concurrency or {}
+        self._lanes: dict[tuple[str, str], _Lane] = {}
+        self._tickets: dict[str, tuple[tuple[str, str], Priority]] = {}
+        self._seq = itertools.count()
+
+    def _lane(self, provider: str, model: str) -> _Lane:
+        key = (provider, model)
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane(
+                self.model_rpm.get(key, self.rpm),
+                self.model_concurrency.get(key, self.max_concurrency),
+            )
+        return lane
+
+    def concurrency(self, provider: str, model: str) -> int:
+        """In-flight cap for calls to *provider*/*model*."""
+        return self._lane(provider, model).max_concurrency
+
+    @asynccontextmanager
+    async def slot(
+        self, provider: str, model: str, priority: Priority = Priority.INTERACTIVE
+    ) -> AsyncIterator[None]:
+        """Hold a rate-limited, concurrency-capped slot for one provider call."""
+        lane = self._lane(provider, model)
+        await lane.acquire((priority, next(self._seq)))
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            await lane.release(time.monotonic() - started)
+
+    def queue_position(self, provider: str, model: str, priority: Priority) -> int:
+        """Admitted generations that would be served before a new one."""
+        lane = self._lane(provider, model)
+        return sum(count for p, count in lane.backlog.items() if p <= priority)
+
+    def admit(
+        self,
+        provider: str,
+        model: str,
+        priority: Priority,
+        generation_ids: Iterable[str],
+    ) -> None:
+        """Accept generations into the backlog, or raise SchedulerBusyError.
+
+        Each admitted id must later be passed to ``release``.
+        """
+        ids = list(generation_ids)
+        lane = self._lane(provider, model)
+        position = self.queue_position(provider, model, priority) + len(ids)
+        if position > self.max_backlog:
+            retry_after = lane.estimated_wait(position - self.max_backlog)
+            raise SchedulerBusyError(provider, model, position, max(1, math.ceil(retry_after)))
+        for generation_id in ids:
+            self._tickets[generation_id] = ((provider, model), priority)
+        lane.backlog[priority] += len(ids)
+
+    def release(self, *generation_ids: str) -> None:
+        """Drop finished generations from the backlog; unknown ids are ignored."""
+        for generation_id in generation_ids:
+            ticket = self._tickets.pop(generation_id, None)
+            if ticket is not None:
+                key, priority = ticket
+                self._lanes[key].backlog[priority] -= 1
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "provider": provider,
+                "model": model,
+                "rpm": lane.rpm,
+                "max_concurrency": lane.max_concurrency,
+                "active": lane.active,
+                "waiting": len(lane.waiting),
+                "backlog": {p.name.lower(): lane.backlog[p] for p in Priority},
+            }
+            for (provider, model), lane in sorted(self._lanes.items())
+        ]
+
+
+provider_scheduler = ProviderScheduler(
+    rpm=settings.PROVIDER_RPM,
+    max_concurrency=settings.PROVIDER_MAX_CONCURRENCY,
+    max_backlog=settings.SCHEDULER_MAX_BACKLOG,
+    model_rpm=settings.provider_model_rpm,
+    model_concurrency=settings.provider_model_concurrency,
+)
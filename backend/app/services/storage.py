@@ -0,0 +1,498 @@
+import asyncio
+import errno
+import io
+import logging
+import mimetypes
+import os
+import posixpath
+import shutil
+import stat
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import aiofiles
+import aiofiles.os
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend(ABC):
+    """Where output and upload files live, addressed by relative keys.
+
+    Keys are the relative paths stored on generations (e.g.
+    ``public/outputs/gen_<id>.png``), so records stay valid whichever backend
+    holds the bytes. Stored files are immutable once written.
+    """
+
+    # Seconds a URL from ``url`` may be cached by clients
+    url_max_age = 0
+
+    @abstractmethod
+    async def write(self, key: str, data: bytes) -> None: ...
+
+    @abstractmethod
+    async def write_file(self, key: str, source: Path) -> None:
+        """Move a local file (e.g. a spooled upload) into storage under *key*."""
+
+    @abstractmethod
+    async def read(self, key: str) -> bytes:
+        """Return the stored bytes.
+
+        Raises:
+            FileNotFoundError: If nothing is stored under *key*.
+        """
+
+    @abstractmethod
+    async def size(self, key: str) -> int | None:
+        """Size in bytes of the stored file, or None if it does not exist."""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """Delete stored files, silently skipping missing ones."""
+
+    async def exists(self, key: str) -> bool:
+        return await self.size(key) is not None
+
+    async def url(self, key: str) -> str | None:
+        """A URL clients can fetch the file from directly, if the backend has one."""
+        return None
+
+    def local_path(self, key: str) -> Path | None:
+        """The file's path on local disk, if the backend keeps files there."""
+        return None
+
+    def is_pending(self, key: str) -> bool:
+        """Whether *key* was written but has not reached its final location yet."""
+        return False
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+async def _stat(path: Path) -> os.stat_result | None:
+    """Stat a regular file without blocking the event loop; None if missing."""
+    try:
+        st = await aiofiles.os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
+async def _read(path: Path) -> bytes:
+    async with aiofiles.open(path, "rb") as f:
+        return await f.read()
+
+
+async def _remove(path: Path) -> None:
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def _move(source: Path, path: Path) -> None:
+    """Atomically move *source* to *path*, copying across filesystems."""
+    await aiofiles.os.makedirs(path.parent, exist_ok=True)
+    try:
+        await aiofiles.os.replace(source, path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        tmp = path.with_name(f".{uuid.uuid4().hex}.part")
+        try:
+            await asyncio.to_thread(shutil.copyfile, source, tmp)
+            await aiofiles.os.replace(tmp, path)
+        except BaseException:
+            await _remove(tmp)
+            raise
+        await _remove(source)
+
+
+class LocalStorage(StorageBackend):
+    """Files on the local filesystem, keys resolved from the backend directory.
+
+    All filesystem calls go through aiofiles, so slow or network-backed
+    volumes do not stall the event loop.
+    """
+
+    async def write(self, key: str, data: bytes) -> None:
+        path = self.local_path(key)
+        await aiofiles.os.makedirs(path.parent, exist_ok=True)
+        tmp = path.with_name(f".{uuid.uuid4().hex}.part")
+        try:
+            async with aiofiles.open(tmp, "wb") as f:
+                await f.write(data)
+            await aiofiles.os.replace(tmp, path)
+        except BaseException:
+            await _remove(tmp)
+            raise
+
+    async def write_file(self, key: str, source: Path) -> None:
+        await _move(source, self.local_path(key))
+
+    async def read(self, key: str) -> bytes:
+        return await _read(self.local_path(key))
+
+    async def size(self, key: str) -> int | None:
+        st = await _stat(self.local_path(key))
+        return st.st_size if st is not None else None
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            await _remove(self.local_path(key))
+
+    def local_path(self, key: str) -> Path:
+        return Path(key).resolve()
+
+
+class S3Storage(StorageBackend):
+    """Files in an S3-compatible bucket (AWS S3, MinIO, R2, ...).
+
+    boto3 is blocking, so every call runs in a worker thread. Large writes go
+    through boto3's managed transfer, which switches to a streaming multipart
+    upload above *multipart_threshold*. ``url`` returns a presigned GET URL,
+    or a plain URL under *public_url* when the bucket is served publicly
+    (e.g. behind a CDN).
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        access_key_id: str | None = None,
+        secret_access_key: str | None = None,
+        public_url: str = "",
+        presign_expires: int = 3600,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        multipart_chunksize: int = 8 * 1024 * 1024,
+        cache_control: str | None = None,
+    ) -> None:
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the 'boto3' package") from e
+
+        if not bucket:
+            raise ValueError("S3_BUCKET must be set when STORAGE_BACKEND=s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.public_url = public_url.rstrip("/")
+        self.presign_expires = presign_expires
+        self.cache_control = cache_control
+        self.url_max_age = (
+            settings.IMAGE_CACHE_MAX_AGE if self.public_url else presign_expires // 2
+        )
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+        )
+        self._transfer = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+        )
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix + posixpath.normpath(Path(key).as_posix()).lstrip("/")
+
+    def _extra_args(self, key: str) -> dict:
+        extra = {"ContentType": mimetypes.guess_type(key)[0] or "application/octet-stream"}
+        if self.cache_control:
+            extra["CacheControl"] = self.cache_control
+        return extra
+
+    @staticmethod
+    def _is_missing(error: Exception) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    async def write(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(
+            self._client.upload_fileobj,
+            io.BytesIO(data),
+            self.bucket,
+            self._object_key(key),
+            ExtraArgs=self._extra_args(key),
+            Config=self._transfer,
+        )
+
+    async def write_file(self, key: str, source: Path) -> None:
+        await asyncio.to_thread(
+            self._client.upload_file,
+            str(source),
+            self.bucket,
+            self._object_key(key),
+            ExtraArgs=self._extra_args(key),
+            Config=self._transfer,
+        )
+        await _remove(source)
+
+    async def read(self, key: str) -> bytes:
+        def get() -> bytes:
+            try:
+                obj = self._client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+            except self._client.exceptions.ClientError as e:
+                if self._is_missing(e):
+                    raise FileNotFoundError(key) from e
+                raise
+            return obj["Body"].read()
+
+        return await asyncio.to_thread(get)
+
+    async def size(self, key: str) -> int | None:
+        def head() -> int | None:
+            try:
+                obj = self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            except self._client.exceptions.ClientError as e:
+                if self._is_missing(e):
+                    return None
+                raise
+            return obj["ContentLength"]
+
+        return await asyncio.to_thread(head)
+
+    async def delete(self, *keys: str) -> None:
+        objects = [{"Key": self._object_key(key)} for key in keys]
+        # DeleteObjects takes at most 1000 keys per request
+        for start in range(0, len(objects), 1000):
+            await asyncio.to_thread(
+                self._client.delete_objects,
+                Bucket=self.bucket,
+                Delete={"Objects": objects[start : start + 1000], "Quiet": True},
+            )
+
+    async def url(self, key: str) -> str:
+        if self.public_url:
+            return f"{self.public_url}/{self._object_key(key)}"
+        return await asyncio.to_thread(
+            self._client.generate_presigned_url,
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key)},
+            ExpiresIn=self.presign_expires,
+        )
+
+
+def _fsync(path: Path) -> None:
+    """Flush a file and its directory entry to disk."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteBehindStorage(StorageBackend):
+    """Acknowledges writes once they are fsynced to a local spool directory,
+    then copies them to *backend* in the background.
+
+    Until a file is flushed, reads and local serving are answered from the
+    spool. Spooled files survive restarts: ``start`` re-queues them, and
+    ``stop`` drains the queue for up to *drain_timeout* seconds. Before
+    ``start`` (scripts, tests) writes go straight to the backend.
+    """
+
+    def __init__(
+        self, backend: StorageBackend, spool_dir: str, workers: int, drain_timeout: float
+    ) -> None:
+        self.backend = backend
+        self.spool_dir = Path(spool_dir)
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self._pending: dict[str, Path] = {}
+        self._queue: asyncio.Queue[str] | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def url_max_age(self) -> int:
+        return self.backend.url_max_age
+
+    def _spool_path(self, key: str) -> Path:
+        return self.spool_dir / quote(key, safe="")
+
+    async def start(self) -> None:
+        if self._queue is not None:
+            return
+        await aiofiles.os.makedirs(self.spool_dir, exist_ok=True)
+        self._queue = asyncio.Queue()
+        for name in await aiofiles.os.listdir(self.spool_dir):
+            path = self.spool_dir / name
+            if name.startswith("."):
+                await _remove(path)  # write interrupted before it was acknowledged
+            else:
+                self._enqueue(unquote(name), path)
+        if self._pending:
+            logger.info(f"Re-queued {len(self._pending)} spooled files for write-behind.")
+        self._tasks = [
+            asyncio.create_task(self._flush_worker(), name=f"write-behind-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Write-behind drain timed out with {len(self._pending)} files still "
+                f"spooled; they will be flushed on next start."
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def _enqueue(self, key: str, path: Path) -> None:
+        self._pending[key] = path
+        self._queue.put_nowait(key)
+
+    async def write(self, key: str, data: bytes) -> None:
+        if self._queue is None:
+            return await self.backend.write(key, data)
+        tmp = self.spool_dir / f".{uuid.uuid4().hex}.part"
+        try:
+            async with aiofiles.open(tmp, "wb") as f:
+                await f.write(data)
+            await self._spool(key, tmp)
+        except BaseException:
+            await _remove(tmp)
+            raise
+
+    async def write_file(self, key: str, source: Path) -> None:
+        if self._queue is None:
+            return await self.backend.write_file(key, source)
+        await self._spool(key, source)
+
+    async def _spool(self, key: str, source: Path) -> None:
+        path = self._spool_path(key)
+        await _move(source, path)
+        await asyncio.to_thread(_fsync, path)
+        self._enqueue(key, path)
+
+    async def _flush_worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            key = await self._queue.get()
+            try:
+                await self._flush(key)
+            finally:
+                self._queue.task_done()
+
+    async def _flush(self, key: str) -> None:
+        path = self._pending.get(key)
+        delay = 1.0
+        while path is not None:
+            # The backend consumes its source, so hand it a hard link and keep
+            # the spooled file readable until the flush has completed
+            tmp = self.spool_dir / f".{uuid.uuid4().hex}.part"
+            try:
+                await aiofiles.os.link(path, tmp)
+                await self.backend.write_file(key, tmp)
+                break
+            except FileNotFoundError:
+                break  # deleted while queued
+            except Exception as e:
+                await _remove(tmp)
+                logger.warning(f"Write-behind flush of {key} failed, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+                path = self._pending.get(key)
+
+        if path is None:
+            return
+        if self._pending.get(key) == path:
+            del self._pending[key]
+            await _remove(path)
+        else:
+            # Deleted while the flush was in flight
+            await self.backend.delete(key)
+
+    async def read(self, key: str) -> bytes:
+        path = self._pending.get(key)
+        if path is not None:
+            try:
+                return await _read(path)
+            except FileNotFoundError:
+                pass  # flushed in the meantime
+        return await self.backend.read(key)
+
+    async def size(self, key: str) -> int | None:
+        path = self._pending.get(key)
+        if path is not None:
+            st = await _stat(path)
+            if st is not None:
+                return st.st_size
+        return await self.backend.size(key)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            path = self._pending.pop(key, None)
+            if path is not None:
+                await _remove(path)
+        await self.backend.delete(*keys)
+
+    async def url(self, key: str) -> str | None:
+        if key in self._pending:
+            return None
+        return await self.backend.url(key)
+
+    def local_path(self, key: str) -> Path | None:
+        path = self._pending.get(key)
+        return path.resolve() if path is not None else self.backend.local_path(key)
+
+    def is_pending(self, key: str) -> bool:
+        return key in self._pending
+
+
+def _create_storage() -> StorageBackend:
+    backend = _create_backend()
+    if settings.STORAGE_WRITE_BEHIND:
+        return WriteBehindStorage(
+            backend,
+            spool_dir=settings.WRITE_BEHIND_DIR,
+            workers=settings.WRITE_BEHIND_WORKERS,
+            drain_timeout=settings.WRITE_BEHIND_DRAIN_TIMEOUT,
+        )
+    return backend
+
+
+def _create_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage()
+    if settings.STORAGE_BACKEND == "s3":
+        logger.info(f"Using S3 storage bucket '{settings.S3_BUCKET}'.")
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            public_url=settings.S3_PUBLIC_URL,
+            presign_expires=settings.S3_PRESIGN_EXPIRES,
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+            cache_control=f"public, max-age={settings.IMAGE_CACHE_MAX_AGE}, immutable",
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+
+
+storage = _create_storage()
@@ -20,10 +20,43 @@ def build_game_asset_prompt(
         cols = cfg.get("cols", 4)
         rows = cfg.get("rows", 4)
         frame_count = cfg.get("frame_count", cols * rows)
+        if cfg.get("mode") == "per_frame":
+            parts.append(
+                f"as {frame_count} animation frames generated one at a time "
+                f"and assembled into a {cols}x{rows} sprite sheet"
+            )
+        else:
+            parts.append(
+                f"as a sprite sheet grid with {cols} columns and {rows} rows, "
+                f"{frame_count} frames total, each frame showing a different "
+                "animation pose, consistent style across all frames"
+            )
+
+    return ", ".join(parts)
+
+
+def build_sprite_frame_prompt(
+    prompt: str,
+    frame_index: int,
+    frame_count: int,
+    negative_prompt: str | None = None,
+    transparent_bg: bool = False,
+) -> str:
+    """Prompt for a single frame of a per-frame sprite sheet (0-based index)."""
+    parts: list[str] = [f"Game asset: {prompt}"]
+
+    if negative_prompt:
+        parts.append(f"Avoid: {negative_prompt}")
+
+    if transparent_bg:
         parts.append(
-            f"as a sprite sheet grid with {cols} columns and {rows} rows, "
-            f"{frame_count} frames total, each frame showing a different "
-            "animation pose, consistent style across all frames"
+            "with transparent background, PNG format, no background"
         )
 
+    parts.append(
+        f"single animation frame {frame_index + 1} of {frame_count}, "
+        "one pose only, character centered at the same scale and position "
+        "as the other frames, consistent style across all frames"
+    )
+
     return ", ".join(parts)
@@ -0,0 +1,125 @@
+"""Benchmark: concurrent slow generations against a small connection pool.
+
+Runs 100 inline generations at once against a stub provider that takes two
+seconds per image, with a two-connection pool and a five-second checkout
+timeout, while /api/history's listing query runs alongside. Generations
+only hold a connection for their short INSERT and UPDATE, so every
+generation should complete and listing latency should stay flat. Exits
+non-zero on any pool timeout or failed generation. Needs a PostgreSQL
+DATABASE_URL (e.g. the docker-compose database); rows created by the run
+are deleted afterwards.
+
+    python -m benchmarks.bench_db_pool
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.stub_servers import openrouter_stub, serve_in_thread
+
+GENERATIONS = 100
+PROVIDER_LATENCY = 2.0
+LIST_INTERVAL = 0.05
+POOL = {"DB_POOL_SIZE": "2", "DB_MAX_OVERFLOW": "0", "DB_POOL_TIMEOUT": "5"}
+
+
+async def run(tag: str) -> bool:
+    # Imported here so the settings above are in place when the engine and
+    # provider singletons are created
+    from sqlalchemy import delete
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+    from app.database import Base, async_session, dispose_engine, get_engine, pool_checked_out
+    from app.models.generation import Generation
+    from app.services.generation_service import create_generation, list_generations
+
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def generate(i: int) -> str:
+        async with async_session() as db:
+            gen = await create_generation(
+                db, f"{tag} sword {i}", "openai/gpt-image-1", "openrouter"
+            )
+            return gen.status
+
+    list_timings: list[float] = []
+    pool_timeouts = 0
+    peak_checked_out = 0
+    done = asyncio.Event()
+
+    async def list_history() -> None:
+        nonlocal pool_timeouts, peak_checked_out
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                async with async_session() as db:
+                    await list_generations(db, page_size=20)
+                list_timings.append((time.perf_counter() - start) * 1000)
+            except PoolTimeout:
+                pool_timeouts += 1
+            peak_checked_out = max(peak_checked_out, pool_checked_out())
+            await asyncio.sleep(LIST_INTERVAL)
+
+    lister = asyncio.create_task(list_history())
+    start = time.perf_counter()
+    try:
+        statuses = await asyncio.gather(
+            *(generate(i) for i in range(GENERATIONS)), return_exceptions=True
+        )
+    finally:
+        elapsed = time.perf_counter() - start
+        done.set()
+        await lister
+        async with async_session() as db:
+            await db.execute(delete(Generation).where(Generation.prompt.like(f"{tag}%")))
+            await db.commit()
+        await dispose_engine()
+
+    completed = sum(status == "completed" for status in statuses)
+    errors = [s for s in statuses if isinstance(s, BaseException)]
+    pool_timeouts += sum(isinstance(e, PoolTimeout) for e in errors)
+    list_timings.sort()
+    print(f"{GENERATIONS} generations x {PROVIDER_LATENCY}s provider latency, pool {POOL}")
+    print(f"  completed {completed}/{GENERATIONS} in {elapsed:.1f}s, errors: {len(errors)}")
+    print(
+        f"  history listing: {len(list_timings)} queries, "
+        f"p50 {statistics.median(list_timings):.1f} ms, "
+        f"p95 {list_timings[int(len(list_timings) * 0.95) - 1]:.1f} ms, "
+        f"max {list_timings[-1]:.1f} ms"
+    )
+    print(f"  pool timeouts: {pool_timeouts}, peak connections checked out: {peak_checked_out}")
+    return completed == GENERATIONS and pool_timeouts == 0
+
+
+def main() -> None:
+    base_url, server = serve_in_thread(openrouter_stub(latency=PROVIDER_LATENCY))
+    scratch = tempfile.TemporaryDirectory(prefix="bench-db-pool-")
+    os.environ.update(
+        POOL,
+        GEMINI_API_KEY="stub",
+        OPENROUTER_API_KEY="stub",
+        OPENROUTER_API_URL=f"{base_url}/api/v1/chat/completions",
+        OUTPUT_DIR=f"{scratch.name}/outputs",
+        UPLOAD_DIR=f"{scratch.name}/uploads",
+        DEBUG="false",
+        RESULT_CACHE_ENABLED="false",
+        # Let all generations reach the provider at once
+        PROVIDER_RPM="0",
+        PROVIDER_MAX_CONCURRENCY=str(GENERATIONS),
+        SCHEDULER_MAX_BACKLOG=str(GENERATIONS),
+    )
+    try:
+        ok = asyncio.run(run(f"bench-db-pool-{uuid.uuid4().hex[:8]}"))
+    finally:
+        server.should_exit = True
+        scratch.cleanup()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
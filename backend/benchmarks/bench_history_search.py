@@ -0,0 +1,93 @@
+"""Benchmark: prompt search with and without the pg_trgm GIN index.
+
+Seeds a scratch table shaped like generations.prompt at 100k and 1M rows,
+then times the substring and relevance queries used by list_generations
+before and after building the index. Needs a PostgreSQL DATABASE_URL (e.g.
+the docker-compose database); the scratch table is dropped afterwards.
+
+    python -m benchmarks.bench_history_search
+"""
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+
+TABLE = "bench_prompt_search"
+ROW_COUNTS = (100_000, 1_000_000)
+TERMS = ("dragon", "golden sword", "xyzzy")
+REPEATS = 5
+
+WORDS = (
+    "pixel art knight dragon golden sword shield potion forest castle "
+    "isometric tile slime wizard staff fire ice chest coin gem skeleton "
+    "bow arrow armor helmet boots ring amulet scroll torch lantern"
+).split()
+
+SEED_SQL = f"""
+INSERT INTO {TABLE} (prompt)
+SELECT array_to_string(ARRAY(
+    SELECT (:words)[1 + floor(random() * :word_count)::int]
+    FROM generate_series(1, 8 + (g % 5))
+), ' ')
+FROM generate_series(1, :rows) AS g
+"""
+
+QUERIES = {
+    "substring": f"SELECT id FROM {TABLE} WHERE prompt ILIKE :pattern "
+    "ORDER BY id DESC LIMIT 20",
+    "count": f"SELECT count(*) FROM {TABLE} WHERE prompt ILIKE :pattern",
+    "relevance": f"SELECT id FROM {TABLE} WHERE prompt ILIKE :pattern "
+    "ORDER BY word_similarity(:term, prompt) DESC LIMIT 20",
+}
+
+
+async def time_query(conn, sql: str, term: str) -> float:
+    params = {"pattern": f"%{term}%", "term": term}
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        await conn.execute(text(sql), params)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+async def run(conn, rows: int) -> None:
+    await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    await conn.execute(text(f"CREATE TABLE {TABLE} (id serial PRIMARY KEY, prompt text)"))
+    await conn.execute(
+        text(SEED_SQL),
+        {"words": list(WORDS), "word_count": len(WORDS), "rows": rows},
+    )
+    await conn.execute(text(f"ANALYZE {TABLE}"))
+
+    for label in ("seq scan", "trgm gin"):
+        if label == "trgm gin":
+            await conn.execute(
+                text(f"CREATE INDEX ON {TABLE} USING gin (prompt gin_trgm_ops)")
+            )
+            await conn.execute(text(f"ANALYZE {TABLE}"))
+        for name, sql in QUERIES.items():
+            for term in TERMS:
+                ms = await time_query(conn, sql, term)
+                print(f"{rows:>9} {label:>9} {name:>10} {term!r:>15} {ms:9.2f} ms")
+
+    await conn.execute(text(f"DROP TABLE {TABLE}"))
+
+
+async def main() -> None:
+    engine = create_async_engine(settings.async_database_url)
+    try:
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for rows in ROW_COUNTS:
+                await run(conn, rows)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""Benchmark: OpenRouter per-request latency with and without a pooled client.
+
+Runs against a local stub server, so the numbers only cover connection setup
+and HTTP overhead. Against the real API the unpooled path also pays DNS and a
+TLS handshake per request, so the gap is larger.
+
+    python -m benchmarks.bench_openrouter_pool
+"""
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.services.openrouter_provider import OpenRouterProvider
+from benchmarks.stub_servers import openrouter_stub, serve_in_thread
+
+REQUESTS = 200
+
+
+class UnpooledProvider(OpenRouterProvider):
+    """Recreates the client on every call, like the original implementation."""
+
+    async def generate(self, *args, **kwargs) -> bytes:
+        self._client = httpx.AsyncClient(timeout=120.0)
+        try:
+            return await super().generate(*args, **kwargs)
+        finally:
+            await self._client.aclose()
+            self._client = None
+
+
+async def measure(provider: OpenRouterProvider) -> list[float]:
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        await provider.generate("a sword", "openai/gpt-image-1")
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{label:>10}: mean {statistics.mean(timings):6.2f} ms  "
+        f"p50 {statistics.median(timings):6.2f} ms  p95 {p95:6.2f} ms"
+    )
+
+
+async def main() -> None:
+    base_url, server = serve_in_thread(openrouter_stub())
+    api_url = f"{base_url}/api/v1/chat/completions"
+    try:
+        report("unpooled", await measure(UnpooledProvider("stub", api_url=api_url)))
+
+        pooled = OpenRouterProvider("stub", api_url=api_url)
+        await pooled.startup(preconnect=1)
+        try:
+            report("pooled", await measure(pooled))
+        finally:
+            await pooled.aclose()
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
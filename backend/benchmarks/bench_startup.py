@@ -0,0 +1,119 @@
+"""Benchmark: import time and boot-to-ready time, checked against a budget.
+
+Measures, each in a fresh interpreter, how long ``import app.main`` takes and
+which heavy modules it pulls in. It then times uvicorn from spawn until
+/api/health/live and /api/health/ready answer, with and without
+FAST_STARTUP. Exits non-zero when a median exceeds its budget or a module
+meant to load lazily (google.genai, PIL, boto3, asyncpg) is imported by
+``app.main``. Readiness needs a PostgreSQL DATABASE_URL (e.g. the
+docker-compose database) with migrations applied.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --import-budget 1200 --boot-budget 2500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.stub_servers import _free_port
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+LAZY_MODULES = ("google.genai", "PIL.Image", "boto3", "asyncpg")
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import() -> tuple[float, list[str]]:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    return result["ms"], result["loaded"]
+
+
+def measure_boot(fast: bool, timeout: float = 60.0) -> dict[str, float | None]:
+    """Milliseconds from spawn until the live and ready probes return 200."""
+    port = _free_port()
+    env = {**os.environ, "FAST_STARTUP": str(fast).lower(), "DEBUG": "false"}
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    timings: dict[str, float | None] = {"live": None, "ready": None}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}/api/health", timeout=1) as client:
+            while time.perf_counter() - start < timeout and process.poll() is None:
+                for probe in ("live", "ready"):
+                    if timings[probe] is None:
+                        try:
+                            if client.get(f"/{probe}").status_code == 200:
+                                timings[probe] = (time.perf_counter() - start) * 1000
+                        except httpx.HTTPError:
+                            pass
+                if timings["ready"] is not None:
+                    break
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return timings
+
+
+def median(values: list[float | None]) -> float | None:
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=1500, help="ms for import app.main")
+    parser.add_argument("--boot-budget", type=float, default=3000, help="ms to ready with FAST_STARTUP")
+    args = parser.parse_args()
+    ok = True
+
+    imports = [measure_import() for _ in range(args.runs)]
+    import_ms = median([ms for ms, _ in imports])
+    loaded = sorted({m for _, found in imports for m in found})
+    print(f"import app.main: median {import_ms:.0f} ms (budget {args.import_budget:.0f} ms)")
+    if loaded:
+        print(f"  eagerly imported: {', '.join(loaded)}")
+    ok &= import_ms <= args.import_budget and not loaded
+
+    for fast in (False, True):
+        boots = [measure_boot(fast) for _ in range(args.runs)]
+        live, ready = median([b["live"] for b in boots]), median([b["ready"] for b in boots])
+        label = "FAST_STARTUP=true " if fast else "FAST_STARTUP=false"
+        print(
+            f"{label}: live {live and f'{live:.0f} ms'}  ready {ready and f'{ready:.0f} ms'}"
+            + (f" (budget {args.boot_budget:.0f} ms)" if fast else "")
+        )
+        if fast:
+            ok &= ready is not None and ready <= args.boot_budget
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
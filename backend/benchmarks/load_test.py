@@ -0,0 +1,303 @@
+"""Load test: drive the API against stub providers and record latency.
+
+Starts local stub OpenRouter and Gemini servers and runs the backend under
+uvicorn in a subprocess pointed at them (OPENROUTER_API_URL, GEMINI_BASE_URL)
+with scratch storage directories. It then drives /api/generate,
+/api/generate/sprite-sheet, /api/history and /api/images/... at each
+concurrency level. Reports throughput, p50/p95/p99 latency, error counts and
+the server's peak RSS, and writes everything as JSON so runs can be compared
+across commits. Needs a PostgreSQL DATABASE_URL (e.g. the docker-compose
+database); generations created by the run are deleted afterwards.
+
+    python -m benchmarks.load_test --concurrency 1 8 32 --requests 100 \\
+        --provider-latency 0.5 --error-rate 0.02 --output load.json
+
+Extra server settings can be passed with ``--set KEY=VALUE`` (e.g.
+``--set IMAGE_PROCESS_WORKERS=4``).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.stub_servers import _free_port, gemini_stub, openrouter_stub, serve_in_thread
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MODELS = {"openrouter": "openai/gpt-image-1", "gemini": "gemini-2.5-flash-image"}
+SCENARIOS = ("generate", "sprite_sheet", "history", "images")
+
+
+@dataclass
+class RunState:
+    """What the generation scenarios produced, for the read scenarios and cleanup."""
+
+    tag: str
+    generation_ids: list[str] = field(default_factory=list)
+    output_names: list[str] = field(default_factory=list)
+
+    def record(self, response: httpx.Response) -> bool:
+        if response.status_code != 200:
+            return False
+        body = response.json()
+        self.generation_ids.append(body["id"])
+        if body["status"] != "completed":
+            return False
+        self.output_names.append(Path(body["output_image_path"]).name)
+        return True
+
+
+Request = Callable[[httpx.AsyncClient, int], Awaitable[bool]]
+
+
+def scenarios(name: str, providers: list[str], state: RunState) -> dict[str, Request]:
+    """Request functions for one scenario; each returns whether it succeeded."""
+    if name in ("generate", "sprite_sheet"):
+        path = "/api/generate" if name == "generate" else "/api/generate/sprite-sheet"
+        requests = {}
+        for provider in providers:
+
+            async def generate(client: httpx.AsyncClient, i: int, provider=provider) -> bool:
+                payload = {
+                    "prompt": f"{state.tag} pixel art sword {i}",
+                    "model": MODELS[provider],
+                    "provider": provider,
+                }
+                if name == "sprite_sheet":
+                    payload["sprite_config"] = {"rows": 4, "cols": 4, "frame_count": 16}
+                return state.record(await client.post(path, json=payload))
+
+            requests[f"{name}:{provider}"] = generate
+        return requests
+
+    if name == "history":
+
+        async def history(client: httpx.AsyncClient, i: int) -> bool:
+            params = {"page_size": 20}
+            if i % 2:
+                params["search"] = state.tag
+            return (await client.get("/api/history", params=params)).status_code == 200
+
+        return {"history": history}
+
+    if name == "images":
+
+        async def image(client: httpx.AsyncClient, i: int, params: dict | None = None) -> bool:
+            name = state.output_names[i % len(state.output_names)]
+            response = await client.get(f"/api/images/outputs/{name}", params=params)
+            return response.status_code == 200
+
+        async def variant(client: httpx.AsyncClient, i: int) -> bool:
+            return await image(client, i, {"w": 256, "format": "webp"})
+
+        return {"images": image, "images:w256": variant} if state.output_names else {}
+
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_level(
+    client: httpx.AsyncClient, request: Request, total: int, concurrency: int
+) -> dict:
+    latencies: list[float] = []
+    outcomes: Counter[str] = Counter()
+    counter = itertools.count()
+
+    async def worker() -> None:
+        while (i := next(counter)) < total:
+            start = time.perf_counter()
+            try:
+                outcomes["ok" if await request(client, i) else "failed"] += 1
+            except httpx.HTTPError as e:
+                outcomes[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "outcomes": dict(outcomes),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 2),
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2),
+        },
+    }
+
+
+def peak_rss_mb(pid: int) -> dict | None:
+    """Peak RSS (VmHWM) of the server and the sum over its child processes.
+
+    Linux only; returns None where /proc is unavailable.
+    """
+
+    def vm_hwm(p: int) -> float:
+        for line in Path(f"/proc/{p}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+        return 0.0
+
+    try:
+        children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+        return {
+            "server": round(vm_hwm(pid), 1),
+            "workers": round(sum(vm_hwm(int(c)) for c in children), 1),
+        }
+    except OSError:
+        return None
+
+
+def start_server(env: dict[str, str]) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/api/models", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not become ready within 60s")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def drive(args: argparse.Namespace, base_url: str, pid: int) -> list[dict]:
+    state = RunState(tag=f"loadtest-{uuid.uuid4().hex[:8]}")
+    results = []
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        try:
+            for name in args.scenarios:
+                for label, request in scenarios(name, args.providers, state).items():
+                    for concurrency in args.concurrency:
+                        result = await run_level(client, request, args.requests, concurrency)
+                        result.update(scenario=label, concurrency=concurrency, peak_rss_mb=peak_rss_mb(pid))
+                        results.append(result)
+                        latency = result["latency_ms"]
+                        print(
+                            f"{label:>22} c={concurrency:<4} {result['throughput_rps']:8.1f} req/s  "
+                            f"p50 {latency['p50']:8.1f} ms  p95 {latency['p95']:8.1f} ms  "
+                            f"p99 {latency['p99']:8.1f} ms  {result['outcomes']}"
+                        )
+        finally:
+            semaphore = asyncio.Semaphore(8)
+
+            async def delete(generation_id: str) -> None:
+                async with semaphore:
+                    await client.delete(f"/api/history/{generation_id}")
+
+            await asyncio.gather(*(delete(g) for g in state.generation_ids), return_exceptions=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario and level")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--providers", nargs="+", choices=list(MODELS), default=list(MODELS))
+    parser.add_argument("--provider-latency", type=float, default=0.2, help="seconds per stub call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub calls failing with 503")
+    parser.add_argument("--image-size", type=int, default=1024, help="side of the stub PNG in pixels")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="extra server setting")
+    parser.add_argument("--output", default="load_test_results.json")
+    args = parser.parse_args()
+
+    stub_options = dict(
+        latency=args.provider_latency, image_size=args.image_size, error_rate=args.error_rate, noise=True
+    )
+    openrouter_url, openrouter_server = serve_in_thread(openrouter_stub(**stub_options))
+    gemini_url, gemini_server = serve_in_thread(gemini_stub(**stub_options))
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as scratch:
+        env = {
+            **os.environ,
+            "GEMINI_API_KEY": "stub",
+            "OPENROUTER_API_KEY": "stub",
+            "GEMINI_BASE_URL": gemini_url,
+            "OPENROUTER_API_URL": f"{openrouter_url}/api/v1/chat/completions",
+            "OUTPUT_DIR": f"{scratch}/outputs",
+            "UPLOAD_DIR": f"{scratch}/uploads",
+            "DERIVATIVE_DIR": f"{scratch}/derivatives",
+            "WRITE_BEHIND_DIR": f"{scratch}/spool",
+            "STORAGE_BACKEND": "local",
+            "DEBUG": "false",
+            # Measure the backend, not the pacing in front of the providers
+            "PROVIDER_RPM": "0",
+            "SCHEDULER_MAX_BACKLOG": "1000000",
+            **dict(item.split("=", 1) for item in args.set),
+        }
+        process, base_url = start_server(env)
+        try:
+            results = asyncio.run(drive(args, base_url, process.pid))
+            peak = peak_rss_mb(process.pid)
+        finally:
+            process.terminate()
+            process.wait(timeout=60)
+            openrouter_server.should_exit = True
+            gemini_server.should_exit = True
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "providers": args.providers,
+            "provider_latency_s": args.provider_latency,
+            "error_rate": args.error_rate,
+            "image_size": args.image_size,
+            "settings": dict(item.split("=", 1) for item in args.set),
+        },
+        "results": results,
+        "peak_rss_mb": peak,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Peak RSS: {peak}  ->  {args.output}")
+
+
+if __name__ == "__main__":
+    main()
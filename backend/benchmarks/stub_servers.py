@@ -0,0 +1,136 @@
+"""Local stand-ins for provider APIs, used by the benchmarks.
+
+Each stub is a plain Starlette app, started on a background thread with
+``serve_in_thread`` so a benchmark can point a provider at ``127.0.0.1``.
+"""
+import asyncio
+import base64
+import io
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+from PIL import Image
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+def make_png(size: int = 64, noise: bool = False) -> bytes:
+    """A square PNG; with *noise* it compresses like a real image would."""
+    if noise:
+        img = Image.effect_noise((size, size), 64).convert("RGB")
+    else:
+        img = Image.new("RGB", (size, size), (255, 255, 255))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def openrouter_stub(
+    latency: float = 0.0,
+    image_size: int = 64,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    retry_after: float | None = None,
+    noise: bool = False,
+) -> Starlette:
+    """OpenRouter chat-completions stub that answers with a single PNG.
+
+    A fraction *error_rate* of requests fail with *error_status*, carrying a
+    Retry-After header when *retry_after* is set.
+    """
+    image_b64 = base64.b64encode(make_png(image_size, noise)).decode()
+
+    async def completions(request: Request) -> JSONResponse:
+        await request.body()
+        if latency:
+            await asyncio.sleep(latency)
+        if error_rate and random.random() < error_rate:
+            headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+            return JSONResponse(
+                {"error": {"message": "stub failure"}},
+                status_code=error_status,
+                headers=headers,
+            )
+        return JSONResponse(
+            {"choices": [{"message": {"role": "assistant", "images": [image_b64]}}]}
+        )
+
+    async def root(request: Request) -> JSONResponse:
+        return JSONResponse({})
+
+    return Starlette(
+        routes=[
+            Route("/api/v1/chat/completions", completions, methods=["POST"]),
+            Route("/", root, methods=["GET", "HEAD"]),
+        ]
+    )
+
+
+def gemini_stub(
+    latency: float = 0.0,
+    image_size: int = 64,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    noise: bool = False,
+) -> Starlette:
+    """Gemini ``models/{model}:generateContent`` stub answering with one PNG.
+
+    Point the SDK at it with ``HttpOptions(base_url=...)`` (GEMINI_BASE_URL).
+    A fraction *error_rate* of requests fail with *error_status*.
+    """
+    image_b64 = base64.b64encode(make_png(image_size, noise)).decode()
+
+    async def generate_content(request: Request) -> JSONResponse:
+        if not request.path_params["call"].endswith(":generateContent"):
+            return JSONResponse({"error": {"code": 404, "message": "not found"}}, 404)
+        await request.body()
+        if latency:
+            await asyncio.sleep(latency)
+        if error_rate and random.random() < error_rate:
+            return JSONResponse(
+                {"error": {"code": error_status, "message": "stub failure", "status": "UNAVAILABLE"}},
+                status_code=error_status,
+            )
+        return JSONResponse(
+            {
+                "candidates": [
+                    {
+                        "content": {
+                            "role": "model",
+                            "parts": [{"inlineData": {"mimeType": "image/png", "data": image_b64}}],
+                        },
+                        "finishReason": "STOP",
+                    }
+                ]
+            }
+        )
+
+    return Starlette(
+        routes=[Route("/{version}/models/{call}", generate_content, methods=["POST"])]
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_in_thread(app: Starlette) -> tuple[str, uvicorn.Server]:
+    """Start *app* on a free local port; returns (base_url, server).
+
+    Stop it with ``server.should_exit = True``.
+    """
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
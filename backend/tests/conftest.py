@@ -0,0 +1,51 @@
+"""Test settings: a scratch SQLite database and storage directories.
+
+Set before any app module is imported, since settings and the singletons
+built from them are read at import time.
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+_scratch = tempfile.mkdtemp(prefix="game-asset-tests-")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite+aiosqlite:///{_scratch}/test.db",
+    OUTPUT_DIR=f"{_scratch}/outputs",
+    UPLOAD_DIR=f"{_scratch}/uploads",
+    DERIVATIVE_DIR=f"{_scratch}/derivatives",
+    WRITE_BEHIND_DIR=f"{_scratch}/spool",
+    STORAGE_BACKEND="local",
+    DEBUG="false",
+    GEMINI_API_KEY="test",
+    OPENROUTER_API_KEY="test",
+    IMAGE_PROCESS_WORKERS="0",
+    RESULT_CACHE_ENABLED="false",
+    PROVIDER_RPM="0",
+)
+
+
+@pytest.fixture
+def run_db():
+    """Run a coroutine against freshly created tables in the scratch database.
+
+    The engine is tied to the event loop, so it is disposed after every run.
+    """
+    from app.database import Base, dispose_engine, get_engine
+
+    async def reset() -> None:
+        async with get_engine().begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        await dispose_engine()
+
+    async def run_and_dispose(coro):
+        try:
+            return await coro
+        finally:
+            await dispose_engine()
+
+    asyncio.run(reset())
+    return lambda coro: asyncio.run(run_and_dispose(coro))
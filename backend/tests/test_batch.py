@@ -0,0 +1,95 @@
+import asyncio
+import io
+
+from PIL import Image
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import async_session
+from app.models.generation import Generation
+from app.services import generation_service
+
+
+def test_failed_flush_fails_its_rows_and_batch_continues(run_db, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "BATCH_FLUSH_SIZE", 1)
+    fail_next_commit = False
+
+    async def execute(gen, bypass_cache=False) -> dict:
+        nonlocal fail_next_commit
+        if gen.id == "b":
+            # Let the previous flush finish before arming the failure
+            await asyncio.sleep(0.05)
+            fail_next_commit = True
+        return {
+            "status": "completed",
+            "output_image_path": f"{gen.id}.png",
+            "thumbnail_path": None,
+            "metadata_json": None,
+        }
+
+    real_commit = generation_service._commit
+
+    async def commit(db) -> None:
+        nonlocal fail_next_commit
+        if fail_next_commit:
+            fail_next_commit = False
+            raise RuntimeError("database went away")
+        await real_commit(db)
+
+    monkeypatch.setattr(generation_service, "_execute_generation", execute)
+    monkeypatch.setattr(generation_service, "_commit", commit)
+
+    async def main() -> dict[str, Generation]:
+        async with async_session() as db:
+            db.add_all(
+                Generation(id=i, prompt="p", model="m", provider="gemini", batch_id="batch")
+                for i in "abc"
+            )
+            await db.commit()
+        await generation_service.run_batch("batch")
+        async with async_session() as db:
+            result = await db.scalars(select(Generation).where(Generation.batch_id == "batch"))
+            return {gen.id: gen for gen in result}
+
+    gens = run_db(main())
+    assert gens["a"].status == "completed"
+    assert gens["c"].status == "completed"
+    assert gens["b"].status == "failed"
+    assert "database went away" in gens["b"].error_message
+
+
+def test_variations_bypass_the_result_cache(run_db, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+    calls = 0
+
+    async def provider(gen, prompt, reference) -> bytes:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        buf = io.BytesIO()
+        Image.new("RGB", (32, 32), (calls * 40, 0, 0)).save(buf, format="PNG")
+        return buf.getvalue()
+
+    monkeypatch.setattr(generation_service, "_call_provider", provider)
+
+    async def main() -> list[Generation]:
+        async with async_session() as db:
+            db.add_all(
+                Generation(
+                    id=f"v{i}", prompt="knight", model="m", provider="gemini", batch_id="variations"
+                )
+                for i in range(3)
+            )
+            await db.commit()
+        await generation_service.run_batch("variations")
+        async with async_session() as db:
+            result = await db.scalars(
+                select(Generation).where(Generation.batch_id == "variations")
+            )
+            return list(result)
+
+    gens = run_db(main())
+    assert calls == 3
+    assert [gen.status for gen in gens] == ["completed"] * 3
+    assert len({gen.output_image_path for gen in gens}) == 3
@@ -0,0 +1,13 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_oversized_variations_are_rejected_before_expanding():
+    client = TestClient(app)
+    response = client.post(
+        "/api/generate/batch",
+        json={"prompt": "knight", "variations": 10**9, "model": "m", "provider": "gemini"},
+    )
+    assert response.status_code == 400
+    assert "Batch too large" in response.json()["detail"]
@@ -0,0 +1,30 @@
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services.cpu_pool import CPUPool
+
+
+def _double(value: int) -> int:
+    return value * 2
+
+
+def _die() -> None:
+    os._exit(1)
+
+
+def test_pool_recovers_after_a_worker_dies():
+    pool = CPUPool(workers=1)
+
+    async def main() -> int:
+        pool.start()
+        try:
+            with pytest.raises(BrokenProcessPool):
+                await pool.run(_die)
+            return await pool.run(_double, 21)
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(main()) == 42
@@ -0,0 +1,41 @@
+import asyncio
+import io
+
+from PIL import Image
+
+from app.config import settings
+from app.database import async_session
+from app.services import generation_service
+
+
+def _png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), (40, 120, 200)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_slow_generations_share_a_single_connection(run_db, monkeypatch):
+    # One connection and a checkout timeout well below the provider latency:
+    # holding the connection across the provider call would time out
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0.2)
+
+    async def slow_provider(gen, prompt, reference) -> bytes:
+        await asyncio.sleep(0.5)
+        return _png()
+
+    monkeypatch.setattr(generation_service, "_call_provider", slow_provider)
+
+    async def request(prompt: str):
+        async with async_session() as db:
+            return await generation_service.create_generation(
+                db, prompt=prompt, model="m", provider="gemini"
+            )
+
+    async def main():
+        return await asyncio.gather(request("knight"), request("dragon"))
+
+    gens = run_db(main())
+    assert [gen.status for gen in gens] == ["completed", "completed"]
+    assert all(gen.error_message is None for gen in gens)
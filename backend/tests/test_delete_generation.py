@@ -0,0 +1,44 @@
+from app.database import async_session
+from app.models.generation import Generation
+from app.services import file_service, generation_service
+
+
+def _sprite(generation_id: str) -> Generation:
+    # A cache hit shares every file of the generation that produced it
+    return Generation(
+        id=generation_id,
+        prompt="knight",
+        model="m",
+        provider="gemini",
+        status="completed",
+        output_image_path="public/outputs/sheet.png",
+        thumbnail_path="public/outputs/thumb_sheet.png",
+        metadata_json={"atlas": {"image_path": "public/outputs/atlas.png"}},
+    )
+
+
+def test_shared_files_are_deleted_with_their_last_generation(run_db, monkeypatch):
+    scheduled: list[tuple[str, ...]] = []
+
+    async def schedule_delete(*paths: str) -> None:
+        scheduled.append(paths)
+
+    monkeypatch.setattr(file_service, "schedule_delete", schedule_delete)
+
+    async def main() -> None:
+        async with async_session() as db:
+            db.add_all([_sprite("original"), _sprite("cache-hit")])
+            await db.commit()
+        async with async_session() as db:
+            assert await generation_service.delete_generation(db, "cache-hit")
+        async with async_session() as db:
+            assert await generation_service.delete_generation(db, "original")
+
+    run_db(main())
+    assert scheduled == [
+        (
+            "public/outputs/sheet.png",
+            "public/outputs/thumb_sheet.png",
+            "public/outputs/atlas.png",
+        )
+    ]
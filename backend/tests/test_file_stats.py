@@ -0,0 +1,55 @@
+import asyncio
+import os
+from pathlib import Path
+
+from app.config import settings
+from app.services import file_service
+from app.services.file_reaper import file_reaper
+from app.services.file_service import StatCache
+
+
+def _write(name: str, data: bytes) -> str:
+    path = Path(settings.OUTPUT_DIR) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_replaced_file_gets_a_fresh_stat_after_the_ttl():
+    cache = StatCache(ttl=0.05)
+    key = _write("stat-ttl.png", b"old")
+
+    async def main():
+        _, before = await cache.lookup(key)
+        # Another worker replaces the file: this process has not invalidated it
+        os.replace(_write("stat-ttl.tmp", b"newer"), key)
+        _, cached = await cache.lookup(key)
+        await asyncio.sleep(0.06)
+        _, after = await cache.lookup(key)
+        return before, cached, after
+
+    before, cached, after = asyncio.run(main())
+    assert cached.st_size == before.st_size == 3
+    assert after.st_size == 5
+
+
+def test_missing_file_is_not_cached():
+    assert asyncio.run(StatCache(ttl=60).lookup(str(Path(settings.OUTPUT_DIR) / "nope.png"))) is None
+
+
+def test_file_queued_for_reaping_is_not_cached():
+    key = _write("stat-reaped.png", b"doomed")
+    stats = file_service.file_stats
+
+    async def main():
+        file_reaper.start()
+        try:
+            assert await stats.lookup(key) is not None
+            await file_service.schedule_delete(key)
+            # Still served while the delete is queued, but not cached again
+            assert await stats.lookup(key) is not None
+        finally:
+            await file_reaper.stop()
+        return await stats.lookup(key)
+
+    assert asyncio.run(main()) is None
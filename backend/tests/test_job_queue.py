@@ -0,0 +1,50 @@
+import asyncio
+
+from app.services.job_queue import GenerationQueue
+
+
+def test_stop_abandons_cancelled_and_queued_jobs():
+    abandoned: list[str] = []
+    finished: list[str] = []
+
+    def on_abandon(name: str):
+        async def callback() -> None:
+            abandoned.append(name)
+
+        return callback
+
+    async def job(name: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        finished.append(name)
+
+    async def main() -> None:
+        queue = GenerationQueue(concurrency=1, drain_timeout=0.05)
+        queue.start()
+        queue.submit(lambda: job("quick", 0), on_abandon("quick"))
+        queue.submit(lambda: job("hung", 60), on_abandon("hung"))
+        queue.submit(lambda: job("queued", 0), on_abandon("queued"))
+        await queue.stop()
+        assert not queue.running
+
+    asyncio.run(main())
+    assert finished == ["quick"]
+    assert sorted(abandoned) == ["hung", "queued"]
+
+
+def test_failing_job_is_not_abandoned():
+    abandoned: list[str] = []
+
+    async def boom() -> None:
+        raise RuntimeError("boom")
+
+    async def record() -> None:
+        abandoned.append("boom")
+
+    async def main() -> None:
+        queue = GenerationQueue(concurrency=1, drain_timeout=1)
+        queue.start()
+        queue.submit(boom, record)
+        await queue.stop()
+
+    asyncio.run(main())
+    assert abandoned == []
@@ -0,0 +1,29 @@
+import asyncio
+import socket
+import time
+
+from app.services import openrouter_provider
+from app.services.openrouter_provider import OpenRouterProvider
+
+
+def test_preconnect_gives_up_on_an_unresponsive_endpoint(monkeypatch):
+    monkeypatch.setattr(openrouter_provider, "PRECONNECT_TIMEOUT", 0.2)
+    # Accepts connections (via the backlog) but never answers
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    port = server.getsockname()[1]
+    provider = OpenRouterProvider("key", f"http://127.0.0.1:{port}/api/v1/chat/completions")
+
+    async def main() -> float:
+        start = time.monotonic()
+        try:
+            await provider.startup(preconnect=1)
+        finally:
+            await provider.aclose()
+        return time.monotonic() - start
+
+    try:
+        assert asyncio.run(main()) < 5
+    finally:
+        server.close()
@@ -0,0 +1,27 @@
+from app.services.progress import ProgressBroker
+
+
+def test_cap_evicts_finished_unwatched_channels_first():
+    broker = ProgressBroker(retention=60, max_channels=2)
+    watched = broker.subscribe("running")
+    broker.publish("running", "started")
+    broker.publish("done", "completed")
+    broker.publish("new", "queued")
+
+    assert len(broker) == 2
+    broker.publish("running", "completed")
+    stages = [watched.get_nowait()["stage"] for _ in range(watched.qsize())]
+    assert stages == ["started", "completed"]
+
+
+def test_dropped_watched_channel_closes_its_streams():
+    broker = ProgressBroker(retention=60, max_channels=1)
+    first = broker.subscribe("a")
+    broker.publish("a", "started")
+    second = broker.subscribe("b")
+    broker.publish("b", "started")
+
+    assert len(broker) == 1
+    assert first.get_nowait()["stage"] == "started"
+    assert first.get_nowait() is None
+    assert second.get_nowait()["stage"] == "started"
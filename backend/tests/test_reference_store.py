@@ -0,0 +1,24 @@
+import asyncio
+
+from app.services import file_service
+from app.services.file_reaper import file_reaper
+from app.services.reference_store import reference_store
+from app.services.storage import storage
+
+
+def test_reusing_a_reference_cancels_its_pending_delete():
+    async def main() -> bool:
+        file_reaper.start()
+        try:
+            path = await file_service.save_upload(b"reference bytes", "ref.png")
+            # Deleting the last generation that used it queues the file for reaping
+            await file_service.schedule_delete(path)
+            reference_store.discard(path)
+
+            reference = await reference_store.load(path)
+            assert reference.data == b"reference bytes"
+        finally:
+            await file_reaper.stop()
+        return await storage.exists(path)
+
+    assert asyncio.run(main())
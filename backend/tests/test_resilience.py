@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.resilience import CircuitOpenError, ResilientCaller
+
+
+def _caller() -> ResilientCaller:
+    return ResilientCaller(
+        max_attempts=1,
+        base_delay=0,
+        max_delay=0,
+        failure_threshold=1,
+        reset_timeout=0.05,
+    )
+
+
+async def _fail(provider: str, model: str) -> bytes:
+    raise httpx.ConnectError("down")
+
+
+async def _ok(provider: str, model: str) -> bytes:
+    return b"image"
+
+
+def test_cancelled_half_open_trial_releases_the_circuit():
+    async def scenario() -> None:
+        caller = _caller()
+        with pytest.raises(httpx.ConnectError):
+            await caller.call("openrouter", "m", _fail)
+        with pytest.raises(CircuitOpenError):
+            await caller.call("openrouter", "m", _ok)
+
+        await asyncio.sleep(0.06)
+        started = asyncio.Event()
+
+        async def hang(provider: str, model: str) -> bytes:
+            started.set()
+            await asyncio.sleep(3600)
+            return b""
+
+        trial = asyncio.create_task(caller.call("openrouter", "m", hang))
+        await started.wait()
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        assert caller.breaker("openrouter", "m").state == "half_open"
+        assert await caller.call("openrouter", "m", _ok) == b"image"
+        assert caller.breaker("openrouter", "m").state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_failed_half_open_trial_reopens_the_circuit():
+    async def scenario() -> None:
+        caller = _caller()
+        with pytest.raises(httpx.ConnectError):
+            await caller.call("openrouter", "m", _fail)
+        await asyncio.sleep(0.06)
+        with pytest.raises(httpx.ConnectError):
+            await caller.call("openrouter", "m", _fail)
+        assert caller.breaker("openrouter", "m").state == "open"
+
+    asyncio.run(scenario())
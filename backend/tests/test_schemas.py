@@ -0,0 +1,24 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.generation import SPRITE_MAX_FRAMES, SpriteConfig
+
+
+def test_sprite_config_defaults_are_valid():
+    assert SpriteConfig().frame_count == 16
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"cols": 0},
+        {"rows": 0},
+        {"rows": 100},
+        {"frame_count": 0},
+        {"rows": 16, "cols": 16, "frame_count": SPRITE_MAX_FRAMES + 1},
+        {"rows": 2, "cols": 2, "frame_count": 5},
+    ],
+)
+def test_sprite_config_rejects_out_of_range_grids(config):
+    with pytest.raises(ValidationError):
+        SpriteConfig(**config)
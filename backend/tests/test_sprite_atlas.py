@@ -0,0 +1,55 @@
+import asyncio
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.models.generation import Generation
+from app.services import generation_service
+
+
+def _png(color: tuple[int, int, int]) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _sprite(**overrides) -> Generation:
+    return Generation(
+        id="atlas-test",
+        prompt="knight",
+        model="m",
+        provider="openrouter",
+        transparent_bg=True,
+        is_sprite_sheet=True,
+        sprite_config={"rows": 2, "cols": 2, "frame_count": 4, "export_atlas": True, **overrides},
+    )
+
+
+def _outputs() -> list[Path]:
+    path = Path(settings.OUTPUT_DIR)
+    return sorted(path.iterdir()) if path.exists() else []
+
+
+def test_failed_atlas_build_leaves_no_files(monkeypatch):
+    async def blank_sheet(gen, prompt, reference) -> bytes:
+        # All white, so background removal leaves no visible frames
+        return _png((255, 255, 255))
+
+    monkeypatch.setattr(generation_service, "_call_provider", blank_sheet)
+    before = _outputs()
+    with pytest.raises(ValueError, match="no visible frames"):
+        asyncio.run(generation_service._produce_image(_sprite(), "knight", None))
+    assert _outputs() == before
+
+
+def test_atlas_is_saved_with_the_sheet(monkeypatch):
+    async def sheet(gen, prompt, reference) -> bytes:
+        return _png((200, 30, 30))
+
+    monkeypatch.setattr(generation_service, "_call_provider", sheet)
+    result = asyncio.run(generation_service._produce_image(_sprite(), "knight", None))
+    assert all(Path(p).exists() for p in result.paths)
+    assert result.metadata["atlas"]["image_path"] == result.extra_paths[0]
@@ -63,7 +63,7 @@ export default function HistoryGallery() {
 
           <Pagination
             page={data.page}
-            totalPages={data.total_pages}
+            totalPages={data.total_pages ?? 0}
             onChange={setPage}
           />
         </>
@@ -2,6 +2,8 @@ export interface SpriteConfig {
   rows: number;
   cols: number;
   frame_count: number;
+  mode?: "grid" | "per_frame";
+  export_atlas?: boolean;
 }
 
 export interface GenerateRequest {
@@ -13,6 +15,9 @@ export interface GenerateRequest {
   image_size?: string;
   transparent_bg?: boolean;
   reference_image_b64?: string;
+  reference_image_path?: string;
+  background?: boolean;
+  bypass_cache?: boolean;
 }
 
 export interface SpriteSheetRequest extends GenerateRequest {
@@ -37,6 +42,7 @@ export interface Generation {
   output_image_path: string | null;
   thumbnail_path: string | null;
   status: "pending" | "generating" | "completed" | "failed";
+  batch_id: string | null;
   error_message: string | null;
   metadata_json: Record<string, unknown> | null;
   created_at: string;
@@ -45,10 +51,11 @@ export interface Generation {
 
 export interface GenerationListResponse {
   items: Generation[];
-  total: number;
+  total: number | null;
   page: number;
   page_size: number;
-  total_pages: number;
+  total_pages: number | null;
+  next_cursor: string | null;
 }
 
 export interface ModelInfo {